@@ -0,0 +1,130 @@
+import json
+import os
+
+import numpy as np
+
+class ColumnStore:
+    """
+    Armazenamento colunar anexável: um diretório com um arquivo binário por coluna
+    (<nome>.bin, os valores de tamanho fixo em sequência) e schema.json com o dtype de
+    cada coluna e metadados livres (rótulos, eixos...). append() anexa uma linha de cada
+    vez, acumulando BUFFER_ROWS linhas antes de gravar, e read() mapeia as colunas com
+    np.memmap, sem ler o arquivo inteiro nem interpretar texto.
+    """
+    SCHEMA_FILE = 'schema.json'
+    BUFFER_ROWS = 4096
+    
+    def __init__(self, path, columns=None, metadata=None):
+        """
+        path: diretório do armazenamento
+        columns: {nome: dtype} para criar um armazenamento vazio (todos os arquivos .bin que já
+            existirem no diretório são apagados, inclusive os de colunas de um schema anterior);
+            None abre um existente, para ler ou continuar anexando
+        metadata: dados serializáveis em JSON gravados no schema (só ao criar)
+        """
+        self.path = path
+        schema_path = os.path.join(path, self.SCHEMA_FILE)
+        if columns is None:
+            with open(schema_path) as f:
+                schema = json.load(f)
+            self.columns = {name: np.dtype(dtype) for name, dtype in schema['columns']}
+            self.metadata = schema['metadata']
+        else:
+            os.makedirs(path, exist_ok=True)
+            for file_name in os.listdir(path):
+                if file_name.endswith('.bin'):
+                    os.remove(os.path.join(path, file_name))
+            self.columns = {name: np.dtype(dtype) for name, dtype in columns.items()}
+            self.metadata = {} if metadata is None else metadata
+            with open(schema_path, 'w') as f:
+                json.dump({'columns': [[name, dtype.str] for name, dtype in self.columns.items()],
+                           'metadata': self.metadata}, f, indent=2)
+            for name in self.columns:
+                open(self._column_path(name), 'wb').close()
+        self.buffers = {name: [] for name in self.columns}
+        self.buffered_rows = 0
+    
+    def _column_path(self, name):
+        return os.path.join(self.path, f'{name}.bin')
+    
+    def _stored_rows(self):
+        # um leitor pode abrir o armazenamento enquanto outro processo anexa: vale o menor
+        # número de linhas completas entre as colunas
+        return min(os.path.getsize(self._column_path(name)) // dtype.itemsize
+                   for name, dtype in self.columns.items())
+    
+    def __len__(self):
+        return self._stored_rows() + self.buffered_rows
+    
+    def append(self, **row):
+        """Anexa uma linha; row precisa ter exatamente as colunas do schema."""
+        if row.keys() != self.columns.keys():
+            raise ValueError(f"A linha deve ter as colunas {list(self.columns)}")
+        for name, value in row.items():
+            self.buffers[name].append(value)
+        self.buffered_rows += 1
+        if self.buffered_rows >= self.BUFFER_ROWS:
+            self.flush()
+    
+    def extend(self, **columns):
+        """Anexa várias linhas de uma vez, dadas como vetores de mesmo tamanho por coluna."""
+        if columns.keys() != self.columns.keys():
+            raise ValueError(f"As colunas devem ser {list(self.columns)}")
+        if len({len(values) for values in columns.values()}) > 1:
+            raise ValueError("Todas as colunas devem ter o mesmo número de linhas")
+        self.flush()
+        for name, values in columns.items():
+            with open(self._column_path(name), 'ab') as f:
+                np.asarray(values, dtype=self.columns[name]).tofile(f)
+    
+    def flush(self):
+        for name, values in self.buffers.items():
+            if values:
+                with open(self._column_path(name), 'ab') as f:
+                    np.asarray(values, dtype=self.columns[name]).tofile(f)
+                values.clear()
+        self.buffered_rows = 0
+    
+    def read(self):
+        """{nome: vetor} com as linhas já gravadas, mapeadas somente para leitura."""
+        num_rows = self._stored_rows()
+        if num_rows == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in self.columns.items()}
+        return {
+            name: np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(num_rows,))
+            for name, dtype in self.columns.items()
+        }
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.flush()
+
+def save_grid(path, axes, **values):
+    """
+    Grava uma grade densa em um .npz: axes é {nome: vetor 1-D} na ordem das dimensões e
+    cada valor é um vetor com forma len(eixo_1) × len(eixo_2) × ..., então uma curva é
+    selecionada por índices (ver axis_index) em vez de filtrar uma lista de linhas.
+    """
+    shape = tuple(len(axis) for axis in axes.values())
+    for name, array in values.items():
+        if np.shape(array) != shape:
+            raise ValueError(f"{name} tem forma {np.shape(array)}; a grade tem forma {shape}")
+    np.savez(path, axis_names=np.array(list(axes)),
+             **{f'axis_{name}': np.asarray(axis) for name, axis in axes.items()}, **values)
+
+def load_grid(path):
+    """Lê uma grade gravada por save_grid; retorna (eixos, valores)."""
+    with np.load(path) as data:
+        names = data['axis_names'].tolist()
+        axes = {name: data[f'axis_{name}'] for name in names}
+        values = {key: data[key] for key in data.files if key != 'axis_names' and not key.startswith('axis_')}
+    return axes, values
+
+def axis_index(axis, value):
+    """Índice de value em um eixo ordenado (busca binária); ValueError se não estiver nele."""
+    index = int(np.searchsorted(axis, value))
+    if index == len(axis) or axis[index] != value:
+        raise ValueError(f"{value} não está no eixo")
+    return index
@@ -0,0 +1,154 @@
+import hashlib
+import itertools
+import math
+import os
+import random
+import statistics
+from multiprocessing import Pool
+
+# valores críticos da distribuição t de Student (bicaudal, 95%) por graus de liberdade
+T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+    9: 2.262, 10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131,
+    16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086, 25: 2.060, 30: 2.042,
+    40: 2.021, 60: 2.000, 120: 1.980
+}
+
+class KeyPermutation:
+    """
+    Permutação pseudoaleatória de [0, universe) definida por uma semente: uma rede de
+    Feistel sobre o menor domínio de 2^(2b) valores que cobre o universo, com
+    "cycle walking" para descartar as imagens fora dele. Como é uma bijeção,
+    permutation(0), permutation(1), ... são chaves distintas sem que o universo ou as
+    chaves já geradas precisem ficar em memória, e o resultado não depende do processo.
+    """
+    
+    ROUNDS = 4
+    
+    def __init__(self, universe, seed):
+        self.universe = universe
+        self.half_bits = max(1, ((universe - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.round_keys = [rng.getrandbits(64) for _ in range(self.ROUNDS)]
+    
+    def _round(self, value, round_key):
+        # finalizador do splitmix64 aplicado a value + chave da rodada
+        h = (value + round_key) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        return (h ^ (h >> 31)) & self.half_mask
+    
+    def _feistel(self, value):
+        left = value >> self.half_bits
+        right = value & self.half_mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ self._round(right, round_key)
+        return (left << self.half_bits) | right
+    
+    def __call__(self, index):
+        value = self._feistel(index)
+        while value >= self.universe:
+            value = self._feistel(value)
+        return value
+
+def stream_random_keys(count, universe, seed, chunk_size=65536, start=0):
+    """
+    Gera count chaves inteiras distintas de [0, universe) em blocos (listas) de até
+    chunk_size chaves: as imagens dos índices start, start + 1, ... pela permutação da
+    semente. Faixas de índices disjuntas dão chaves disjuntas, então as consultas
+    negativas podem usar start=count com a mesma semente.
+    """
+    if start + count > universe:
+        raise ValueError("O universo não tem chaves distintas suficientes")
+    permutation = KeyPermutation(universe, seed)
+    for chunk_start in range(start, start + count, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, start + count)
+        yield [permutation(index) for index in range(chunk_start, chunk_end)]
+
+def task_seed(base_seed, params):
+    """
+    Semente determinística de uma tarefa, derivada da semente base e dos parâmetros.
+    Não depende do processo nem de PYTHONHASHSEED, então é a mesma em qualquer worker.
+    """
+    text = repr((base_seed, sorted(params.items())))
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], 'little')
+
+def expand_grid(grid):
+    """Produto cartesiano de {parâmetro: [valores]} como uma lista de dicionários."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def _run_task(task_and_params):
+    task, params = task_and_params
+    return task(**params)
+
+def run_grid(task, grid, num_seeds, base_seed=0, processes=None, seed_params=None):
+    """
+    Executa task(**parâmetros, seed=...) para cada combinação de grid e cada uma das
+    num_seeds repetições, distribuindo as tarefas em um pool de processos.
+    task deve ser uma função de nível de módulo que retorna {métrica: valor}.
+    seed_params: parâmetros dos quais a semente é derivada (padrão: todos); combinações
+    que só diferem nos demais recebem a mesma semente em cada repetição, e duas grades
+    com os mesmos seed_params usam as mesmas sementes.
+    Retorna uma lista de {'params', 'replica', 'seed', 'metrics'}.
+    """
+    tasks = []
+    for params in expand_grid(grid):
+        seed_source = params if seed_params is None else {name: params[name] for name in seed_params}
+        for replica in range(num_seeds):
+            seed = task_seed(base_seed, {**seed_source, 'replica': replica})
+            tasks.append((params, replica, seed))
+    
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (processes * 4))
+    with Pool(processes) as pool:
+        metrics = pool.map(_run_task, [(task, {**params, 'seed': seed}) for params, _, seed in tasks],
+                           chunksize=chunksize)
+    
+    return [
+        {'params': params, 'replica': replica, 'seed': seed, 'metrics': task_metrics}
+        for (params, replica, seed), task_metrics in zip(tasks, metrics)
+    ]
+
+def t_critical_95(degrees_of_freedom):
+    """Valor crítico t para 95%, usando o maior grau tabelado que não excede o pedido."""
+    if degrees_of_freedom > max(T_CRITICAL_95):
+        return 1.960
+    return T_CRITICAL_95[max(df for df in T_CRITICAL_95 if df <= degrees_of_freedom)]
+
+def confidence_interval(values):
+    """
+    Média e intervalo de confiança de 95% (t de Student) de uma amostra.
+    Retorna (média, limite inferior, limite superior).
+    """
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, mean, mean
+    half_width = t_critical_95(len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+    return mean, mean - half_width, mean + half_width
+
+def summarize(runs):
+    """
+    Agrupa as execuções pelos parâmetros (todas as repetições juntas) e calcula, para
+    cada métrica, média, desvio padrão e intervalo de confiança de 95%.
+    """
+    groups = {}
+    for run in runs:
+        key = tuple(sorted(run['params'].items()))
+        groups.setdefault(key, []).append(run['metrics'])
+    
+    summary = []
+    for key, group_metrics in groups.items():
+        entry = {'params': dict(key), 'num_seeds': len(group_metrics), 'metrics': {}}
+        for metric in group_metrics[0]:
+            values = [metrics[metric] for metrics in group_metrics]
+            mean, ci_low, ci_high = confidence_interval(values)
+            entry['metrics'][metric] = {
+                'mean': mean,
+                'std': statistics.stdev(values) if len(values) > 1 else 0.0,
+                'ci_low': ci_low,
+                'ci_high': ci_high
+            }
+        summary.append(entry)
+    return summary
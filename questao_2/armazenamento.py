@@ -0,0 +1,368 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import OrderedDict
+
+# cabeçalho de cada página no arquivo: número de registros e página de overflow (-1 = nenhuma)
+PAGE_HEADER = struct.Struct('<qq')
+NO_PAGE = -1
+MIN_BUFFER_PAGES = 8
+
+class Page:
+    """
+    Página de capacidade fixa: os registros ficam nas primeiras count posições de um
+    vetor de inteiros de 64 bits pré-alocado, sem um objeto Python por registro.
+    """
+    __slots__ = ('capacity', 'count', 'slots', 'overflow_page')
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0
+        self.slots = array('q', bytes(8 * capacity))
+        # identificador (no page store) da próxima página da cadeia de overflow
+        self.overflow_page = None
+    
+    @property
+    def records(self):
+        return self.slots[:self.count]
+    
+    @records.setter
+    def records(self, records):
+        count = len(records)
+        if count > self.capacity:
+            raise ValueError(f"{count} registros não cabem em uma página de capacidade {self.capacity}")
+        self.slots[:count] = array('q', records)
+        self.count = count
+    
+    def __len__(self):
+        return self.count
+    
+    def __contains__(self, record):
+        try:
+            self.slots.index(record, 0, self.count)
+            return True
+        except ValueError:
+            return False
+    
+    def is_full(self):
+        return self.count >= self.capacity
+    
+    def insert(self, record):
+        if not self.is_full():
+            self.slots[self.count] = record
+            self.count += 1
+            return True
+        return False
+    
+    def extend(self, records):
+        self.records = self.records + array('q', records)
+    
+    def remove(self, record):
+        try:
+            index = self.slots.index(record, 0, self.count)
+        except ValueError:
+            return False
+        # a ordem dos registros não importa: o último ocupa o lugar do removido
+        self.count -= 1
+        self.slots[index] = self.slots[self.count]
+        return True
+    
+    def pop(self):
+        self.count -= 1
+        return self.slots[self.count]
+    
+    @classmethod
+    def from_slot(cls, capacity, buffer, offset):
+        """Página lida de um slot no formato do arquivo (PAGE_HEADER + registros) em buffer."""
+        count, overflow_page = PAGE_HEADER.unpack_from(buffer, offset)
+        page = cls.__new__(cls)
+        page.capacity = capacity
+        page.count = count
+        page.slots = array('q')
+        start = offset + PAGE_HEADER.size
+        page.slots.frombytes(buffer[start:start + 8 * capacity])
+        page.overflow_page = None if overflow_page == NO_PAGE else overflow_page
+        return page
+    
+    def to_slot(self):
+        """Bytes da página no formato do arquivo."""
+        overflow_page = NO_PAGE if self.overflow_page is None else self.overflow_page
+        return PAGE_HEADER.pack(self.count, overflow_page) + self.slots.tobytes()
+    
+    def __repr__(self):
+        return f"Page(records={self.records.tolist()})"
+
+def page_slot_size(capacity):
+    """Bytes de uma página no arquivo: cabeçalho + capacity registros de 64 bits."""
+    return PAGE_HEADER.size + 8 * capacity
+
+def page_memory_bytes(capacity):
+    """Bytes ocupados em memória por uma Page de capacidade capacity (objeto + vetor)."""
+    page = Page(capacity)
+    return sys.getsizeof(page) + sys.getsizeof(page.slots)
+
+class MemoryPageStore:
+    """Páginas mantidas como objetos em memória (comportamento original das tabelas)."""
+    
+    def __init__(self, page_capacity):
+        self.page_capacity = page_capacity
+        self.page_bytes = page_memory_bytes(page_capacity)
+        self.pages = []
+        self.free_pages = []
+        self.num_pages = 0
+        self.reads = 0
+        self.writes = 0
+    
+    @classmethod
+    def from_slots(cls, page_capacity, buffer, num_page_ids, free_pages):
+        """
+        Store com as páginas 0 .. num_page_ids - 1 lidas de buffer (slots consecutivos
+        no formato do arquivo); os slots de free_pages são ignorados.
+        """
+        store = cls(page_capacity)
+        slot_size = page_slot_size(page_capacity)
+        free = set(free_pages)
+        store.pages = [
+            None if page_id in free else Page.from_slot(page_capacity, buffer, page_id * slot_size)
+            for page_id in range(num_page_ids)
+        ]
+        store.free_pages = list(free_pages)
+        store.num_pages = num_page_ids - len(free)
+        return store
+    
+    def allocate(self):
+        page = Page(self.page_capacity)
+        if self.free_pages:
+            page_id = self.free_pages.pop()
+            self.pages[page_id] = page
+        else:
+            page_id = len(self.pages)
+            self.pages.append(page)
+        self.num_pages += 1
+        return page_id
+    
+    def read(self, page_id):
+        self.reads += 1
+        return self.pages[page_id]
+    
+    def write(self, page_id, page):
+        self.writes += 1
+        self.pages[page_id] = page
+    
+    def free(self, page_id):
+        self.pages[page_id] = None
+        self.free_pages.append(page_id)
+        self.num_pages -= 1
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    def get_stats(self):
+        return {'reads': self.reads, 'writes': self.writes}
+    
+    def page_id_bound(self):
+        """Número de identificadores de página já usados (páginas vivas e livres)."""
+        return len(self.pages)
+    
+    def dump_pages(self, file):
+        """Escreve os slots de todas as páginas, em ordem de identificador, em file."""
+        empty_slot = Page(self.page_capacity).to_slot()
+        for page in self.pages:
+            file.write(empty_slot if page is None else page.to_slot())
+    
+    def memory_bytes(self):
+        return (self.num_pages * self.page_bytes + sys.getsizeof(self.pages)
+                + sys.getsizeof(self.free_pages))
+
+class DiskPageStore:
+    """
+    Páginas de tamanho fixo em um único arquivo mapeado em memória, acessadas por
+    um buffer pool limitado com substituição LRU e escrita adiada das páginas sujas.
+
+    Quem altera uma página obtida com read() deve devolvê-la com write(); uma página
+    suja só vai para o arquivo quando é expulsa do buffer ou em flush().
+    """
+    
+    def __init__(self, page_capacity, path=None, buffer_pages=256, initial_pages=64, temporary=None,
+                 num_page_ids=None, free_pages=None, offset=0, copy_on_write=False):
+        """
+        page_capacity: número de registros por página
+        path: arquivo de páginas (padrão: arquivo temporário)
+        buffer_pages: número máximo de páginas mantidas no buffer pool
+        initial_pages: número de slots reservados inicialmente no arquivo
+        temporary: se o arquivo é removido em close() (padrão: só quando path não é dado)
+        num_page_ids, free_pages: reabrem um arquivo de páginas existente, cujos slots
+            0 .. num_page_ids - 1 estão ocupados exceto os de free_pages (ver persistencia.py);
+            sem eles o arquivo é criado vazio
+        offset, copy_on_write: com copy_on_write, path é só lido: os num_page_ids slots que
+            começam em offset (por exemplo, dentro de um snapshot) são mapeados em modo cópia
+            na escrita (mmap.ACCESS_COPY), então as páginas alteradas ficam na memória do
+            processo e o arquivo não muda; as páginas novas vão para um arquivo temporário
+        """
+        if buffer_pages < MIN_BUFFER_PAGES:
+            raise ValueError(f"buffer_pages deve ser pelo menos {MIN_BUFFER_PAGES}")
+        self.page_capacity = page_capacity
+        self.page_bytes = page_memory_bytes(page_capacity)
+        self.slot_size = page_slot_size(page_capacity)
+        self.buffer_pages = buffer_pages
+        
+        # slots 0 .. base_slots - 1: mapeados do arquivo somente leitura (copy_on_write);
+        # os demais ficam no arquivo de páginas próprio, a partir do início dele
+        self.base_slots = 0
+        self.base_map = None
+        if copy_on_write:
+            if num_page_ids is None:
+                raise ValueError("copy_on_write exige num_page_ids (um arquivo de páginas existente)")
+            self.base_slots = num_page_ids
+            # o mmap só começa em múltiplos de ALLOCATIONGRANULARITY
+            start = offset - offset % mmap.ALLOCATIONGRANULARITY
+            self.base_delta = offset - start
+            if num_page_ids > 0:
+                with open(path, 'rb') as base_file:
+                    self.base_map = mmap.mmap(base_file.fileno(), self.base_delta + num_page_ids * self.slot_size,
+                                              access=mmap.ACCESS_COPY, offset=start)
+            path = None
+            temporary = True
+        
+        self.temporary = path is None if temporary is None else temporary
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix='.pages')
+            os.close(fd)
+        self.path = path
+        reopen = num_page_ids is not None and not copy_on_write
+        self.file = open(path, 'r+b' if reopen else 'w+b')
+        self.num_slots = max(num_page_ids if reopen else initial_pages, 1)
+        if os.path.getsize(path) < self.num_slots * self.slot_size:
+            self.file.truncate(self.num_slots * self.slot_size)
+        self.mmap = mmap.mmap(self.file.fileno(), self.num_slots * self.slot_size)
+        
+        self.buffer = OrderedDict()
+        self.dirty = set()
+        self.next_page_id = 0 if num_page_ids is None else num_page_ids
+        self.free_pages = list(free_pages or [])
+        self.num_pages = self.next_page_id - len(self.free_pages)
+        
+        self.reads = 0
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def allocate(self):
+        if self.free_pages:
+            page_id = self.free_pages.pop()
+        else:
+            page_id = self.next_page_id
+            self.next_page_id += 1
+            if page_id - self.base_slots >= self.num_slots:
+                self._grow()
+        self.num_pages += 1
+        self._put(page_id, Page(self.page_capacity), dirty=True)
+        return page_id
+    
+    def read(self, page_id):
+        page = self.buffer.get(page_id)
+        if page is not None:
+            self.hits += 1
+            self.buffer.move_to_end(page_id)
+            return page
+        
+        self.misses += 1
+        page = self._load(page_id)
+        self.reads += 1
+        self._put(page_id, page, dirty=False)
+        return page
+    
+    def write(self, page_id, page):
+        self._put(page_id, page, dirty=True)
+    
+    def free(self, page_id):
+        self.buffer.pop(page_id, None)
+        self.dirty.discard(page_id)
+        self.free_pages.append(page_id)
+        self.num_pages -= 1
+    
+    def flush(self):
+        for page_id in self.dirty:
+            self._store(page_id, self.buffer[page_id])
+            self.writes += 1
+        self.dirty.clear()
+        self.mmap.flush()
+    
+    def close(self):
+        if self.mmap.closed:
+            return
+        self.flush()
+        self.mmap.close()
+        self.file.close()
+        if self.base_map is not None:
+            self.base_map.close()
+        if self.temporary:
+            os.remove(self.path)
+    
+    def get_stats(self):
+        accesses = self.hits + self.misses
+        return {
+            'reads': self.reads,
+            'writes': self.writes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / accesses if accesses > 0 else 0
+        }
+    
+    def page_id_bound(self):
+        """Número de identificadores de página já usados (páginas vivas e livres)."""
+        return self.next_page_id
+    
+    def dump_pages(self, file):
+        """Escreve os slots de todas as páginas, em ordem de identificador, em file."""
+        self.flush()
+        if self.base_map is not None:
+            with memoryview(self.base_map) as view:
+                file.write(view[self.base_delta:])
+        with memoryview(self.mmap) as view:
+            file.write(view[:(self.next_page_id - self.base_slots) * self.slot_size])
+    
+    def memory_bytes(self):
+        # só o buffer pool fica em memória; as páginas em si estão no arquivo
+        return (len(self.buffer) * self.page_bytes + sys.getsizeof(self.buffer)
+                + sys.getsizeof(self.dirty) + sys.getsizeof(self.free_pages))
+    
+    def file_bytes(self):
+        return (self.base_slots + self.num_slots) * self.slot_size
+    
+    def _put(self, page_id, page, dirty):
+        self.buffer[page_id] = page
+        self.buffer.move_to_end(page_id)
+        if dirty:
+            self.dirty.add(page_id)
+        
+        while len(self.buffer) > self.buffer_pages:
+            victim_id, victim = self.buffer.popitem(last=False)
+            if victim_id in self.dirty:
+                self.dirty.discard(victim_id)
+                self._store(victim_id, victim)
+                self.writes += 1
+    
+    def _grow(self):
+        self.num_slots *= 2
+        self.mmap.resize(self.num_slots * self.slot_size)
+    
+    def _slot(self, page_id):
+        """(mapa, posição) do slot de page_id."""
+        if page_id < self.base_slots:
+            return self.base_map, self.base_delta + page_id * self.slot_size
+        return self.mmap, (page_id - self.base_slots) * self.slot_size
+    
+    def _load(self, page_id):
+        pages, offset = self._slot(page_id)
+        return Page.from_slot(self.page_capacity, pages, offset)
+    
+    def _store(self, page_id, page):
+        pages, offset = self._slot(page_id)
+        pages[offset:offset + self.slot_size] = page.to_slot()
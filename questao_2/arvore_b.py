@@ -0,0 +1,348 @@
+import math
+from bisect import bisect_left, bisect_right
+
+from armazenamento import MemoryPageStore
+from instrumentacao import instrumented
+from persistencia import save_snapshot, load_snapshot
+
+# convenções de capacidade de questao_1/README.md: grau mínimo t (2t - 1 chaves por nó,
+# no mínimo t - 1) ou ordem d (2d chaves por nó, no mínimo d)
+CONVENTIONS = ('t', 'd')
+
+def node_limits(order, convention):
+    """(máximo, mínimo) de chaves por nó, exceto a raiz, para a ordem na convenção dada."""
+    if convention == 't':
+        if order < 2:
+            raise ValueError("t deve ser pelo menos 2")
+        return 2 * order - 1, order - 1
+    if convention == 'd':
+        if order < 1:
+            raise ValueError("d deve ser pelo menos 1")
+        return 2 * order, order
+    raise ValueError(f"Convenção desconhecida: {convention} (use uma de {CONVENTIONS})")
+
+def node_slots(max_keys):
+    """Slots de uma página de nó: o nó interno cheio guarda max_keys chaves e max_keys + 1 filhos."""
+    return 2 * max_keys + 1
+
+def internal_entries(page):
+    """(chaves, filhos) de um nó interno: os registros da página são as n chaves seguidas dos n + 1 filhos."""
+    num_keys = (page.count - 1) // 2
+    return page.slots[:num_keys], page.slots[num_keys:page.count]
+
+def chunk_sizes(count, target, minimum):
+    """
+    Divide count itens em grupos de tamanho próximo de target, distribuídos por igual;
+    se houver mais de um grupo, nenhum fica com menos de minimum itens.
+    """
+    num_chunks = max(1, math.ceil(count / target))
+    if num_chunks > 1 and count // num_chunks < minimum:
+        num_chunks = count // minimum
+    base, extra = divmod(count, num_chunks)
+    return [base + 1] * extra + [base] * (num_chunks - extra)
+
+class BPlusTree:
+    """
+    Árvore B+ sobre o mesmo modelo de páginas das tabelas hash (armazenamento.py): cada
+    nó é uma Page do store e cada página lida ou escrita soma 1 ao io_cost. As chaves
+    ficam só nas folhas, em ordem, e cada folha aponta para a seguinte pelo campo
+    overflow_page da página, o que permite percorrer um intervalo sem voltar aos nós
+    internos. As chaves são únicas: inserir uma chave já presente não altera a árvore.
+    """
+    
+    # estado gravado no snapshot (persistencia.py), além das páginas
+    SNAPSHOT_FIELDS = ('order', 'convention', 'max_keys', 'min_keys', 'page_capacity', 'root', 'height',
+                       'num_records', 'num_splits', 'num_merges', 'io_cost')
+    
+    def __init__(self, order, convention='d', store=None, recorder=None):
+        """
+        order: grau mínimo t ou ordem d, conforme convention
+        convention: 't' (até 2t - 1 chaves por nó) ou 'd' (até 2d chaves por nó)
+        store: onde as páginas são guardadas (padrão: MemoryPageStore); as páginas precisam
+            ter node_slots(máximo de chaves) slots, para caberem as chaves e os filhos
+        recorder: OperationRecorder opcional (instrumentacao.py) que recebe o tempo e as
+            páginas tocadas de cada operação e os eventos estruturais
+        """
+        self.order = order
+        self.convention = convention
+        self.max_keys, self.min_keys = node_limits(order, convention)
+        # número de registros por folha, como o page_capacity das tabelas hash
+        self.page_capacity = self.max_keys
+        slots = node_slots(self.max_keys)
+        self.store = MemoryPageStore(slots) if store is None else store
+        if self.store.page_capacity != slots:
+            raise ValueError(f"O store deve ter páginas de {slots} slots (chaves e filhos de um nó interno)")
+        # a raiz começa como uma folha vazia; height é o número de níveis (1: a raiz é folha)
+        self.root = self.store.allocate()
+        self.height = 1
+        self.num_records = 0
+        self.num_splits = 0
+        self.num_merges = 0
+        self.io_cost = 0
+        self.recorder = recorder
+    
+    def _emit(self, kind, **details):
+        if self.recorder is not None:
+            self.recorder.event(kind, self.num_records, **details)
+    
+    def _read(self, page_id):
+        self.io_cost += 1
+        return self.store.read(page_id)
+    
+    def _write(self, page_id, page, keys, children=None):
+        """Grava o nó com as chaves dadas (e os filhos, se for um nó interno)."""
+        page.records = keys if children is None else keys + children
+        self.store.write(page_id, page)
+        self.io_cost += 1
+    
+    def _descend(self, key):
+        """
+        Desce da raiz até a folha onde key estaria (a folha mais à esquerda se key for
+        None). Retorna (caminho, folha): o caminho tem (página, nó, chaves, filhos, índice
+        do filho seguido) de cada nó interno, da raiz para baixo.
+        """
+        path = []
+        page_id = self.root
+        for _ in range(self.height - 1):
+            page = self._read(page_id)
+            keys, children = internal_entries(page)
+            index = 0 if key is None else bisect_right(keys, key)
+            path.append((page_id, page, keys, children, index))
+            page_id = children[index]
+        return path, page_id
+    
+    @instrumented('search')
+    def search(self, key):
+        _, leaf_id = self._descend(key)
+        leaf = self._read(leaf_id)
+        index = bisect_left(leaf.slots, key, 0, leaf.count)
+        return index < leaf.count and leaf.slots[index] == key
+    
+    def range_search(self, low=None, high=None):
+        """
+        Chaves em [low, high], em ordem (None: sem limite): desce uma vez até a folha de low
+        e segue o encadeamento das folhas até passar de high.
+        """
+        _, leaf_id = self._descend(low)
+        result = []
+        while leaf_id is not None:
+            leaf = self._read(leaf_id)
+            keys = leaf.records
+            start = 0 if low is None else bisect_left(keys, low)
+            end = len(keys) if high is None else bisect_right(keys, high)
+            result.extend(keys[start:end])
+            if end < len(keys):
+                break
+            leaf_id = leaf.overflow_page
+        return result
+    
+    @instrumented('insert')
+    def insert(self, key):
+        """Insere key; retorna False (sem alterar a árvore) se ela já estiver presente."""
+        path, leaf_id = self._descend(key)
+        leaf = self._read(leaf_id)
+        keys = leaf.records
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return False
+        keys.insert(index, key)
+        self.num_records += 1
+        
+        if len(keys) <= self.max_keys:
+            self._write(leaf_id, leaf, keys)
+            return True
+        
+        # folha cheia: a metade de cima vai para uma folha nova, encadeada logo após esta,
+        # e a sua primeira chave sobe para o pai como separador
+        middle = len(keys) // 2
+        new_id = self.store.allocate()
+        new_leaf = self.store.read(new_id)
+        new_leaf.overflow_page = leaf.overflow_page
+        leaf.overflow_page = new_id
+        self._write(new_id, new_leaf, keys[middle:])
+        self._write(leaf_id, leaf, keys[:middle])
+        self.num_splits += 1
+        self._emit('split', page=leaf_id, new_page=new_id)
+        separator = keys[middle]
+        
+        for page_id, page, keys, children, index in reversed(path):
+            keys.insert(index, separator)
+            children.insert(index + 1, new_id)
+            if len(keys) <= self.max_keys:
+                self._write(page_id, page, keys, children)
+                return True
+            
+            # nó interno cheio: a chave do meio sobe e não fica em nenhuma das metades
+            middle = len(keys) // 2
+            separator = keys[middle]
+            new_id = self.store.allocate()
+            self._write(new_id, self.store.read(new_id), keys[middle + 1:], children[middle + 1:])
+            self._write(page_id, page, keys[:middle], children[:middle + 1])
+            self.num_splits += 1
+            self._emit('split', page=page_id, new_page=new_id)
+        
+        # a raiz foi dividida: uma raiz nova com as duas metades aumenta a altura
+        root_id = self.store.allocate()
+        self._write(root_id, self.store.read(root_id), [separator], [self.root, new_id])
+        self.root = root_id
+        self.height += 1
+        self._emit('new_root', page=root_id, height=self.height)
+        return True
+    
+    @instrumented('delete')
+    def delete(self, key):
+        path, leaf_id = self._descend(key)
+        leaf = self._read(leaf_id)
+        keys = leaf.records
+        index = bisect_left(keys, key)
+        if index == len(keys) or keys[index] != key:
+            return False
+        del keys[index]
+        self.num_records -= 1
+        
+        # um nó abaixo do mínimo pega uma chave emprestada de um irmão ou é fundido com ele;
+        # a fusão tira uma chave do pai, que pode ficar abaixo do mínimo por sua vez
+        page_id, page, children = leaf_id, leaf, None
+        while path and len(keys) < self.min_keys:
+            parent_id, parent, parent_keys, parent_children, index = path.pop()
+            # o irmão da esquerda, se houver; senão o da direita. left/right ordenam o par
+            if index > 0:
+                separator = index - 1
+                sibling_id = parent_children[separator]
+            else:
+                separator = index
+                sibling_id = parent_children[index + 1]
+            sibling = self._read(sibling_id)
+            if children is None:
+                sibling_keys, sibling_children = sibling.records, None
+            else:
+                sibling_keys, sibling_children = internal_entries(sibling)
+            node = (page_id, page, keys, children)
+            other = (sibling_id, sibling, sibling_keys, sibling_children)
+            (left_id, left, left_keys, left_children), (right_id, right, right_keys, right_children) = (
+                (other, node) if index > 0 else (node, other))
+            
+            if len(sibling_keys) > self.min_keys:
+                if children is None:
+                    if index > 0:
+                        right_keys.insert(0, left_keys.pop())
+                    else:
+                        left_keys.append(right_keys.pop(0))
+                    parent_keys[separator] = right_keys[0]
+                elif index > 0:
+                    right_keys.insert(0, parent_keys[separator])
+                    right_children.insert(0, left_children.pop())
+                    parent_keys[separator] = left_keys.pop()
+                else:
+                    left_keys.append(parent_keys[separator])
+                    left_children.append(right_children.pop(0))
+                    parent_keys[separator] = right_keys.pop(0)
+                self._write(left_id, left, left_keys, left_children)
+                self._write(right_id, right, right_keys, right_children)
+                self._write(parent_id, parent, parent_keys, parent_children)
+                return True
+            
+            # os dois cabem em um nó: o da direita é juntado ao da esquerda e liberado
+            if children is None:
+                left_keys.extend(right_keys)
+                left.overflow_page = right.overflow_page
+            else:
+                left_keys.append(parent_keys[separator])
+                left_keys.extend(right_keys)
+                left_children.extend(right_children)
+            self._write(left_id, left, left_keys, left_children)
+            self.store.free(right_id)
+            del parent_keys[separator]
+            del parent_children[separator + 1]
+            self.num_merges += 1
+            self._emit('merge', page=left_id, freed_page=right_id)
+            page_id, page, keys, children = parent_id, parent, parent_keys, parent_children
+        
+        if not path and children is not None and not keys:
+            # a raiz ficou com um único filho, que passa a ser a raiz
+            self.store.free(page_id)
+            self.root = children[0]
+            self.height -= 1
+            self._emit('root_collapse', page=self.root, height=self.height)
+        else:
+            self._write(page_id, page, keys, children)
+        return True
+    
+    def update(self, old_key, new_key):
+        if not self.delete(old_key):
+            return False
+        self.insert(new_key)
+        return True
+    
+    def _drain(self):
+        """Lê todas as páginas, nível a nível, liberando-as; retorna as chaves das folhas."""
+        level = [self.root]
+        for _ in range(self.height - 1):
+            next_level = []
+            for page_id in level:
+                next_level.extend(internal_entries(self._read(page_id))[1])
+                self.store.free(page_id)
+            level = next_level
+        records = []
+        for page_id in level:
+            records.extend(self._read(page_id).records)
+            self.store.free(page_id)
+        return records
+    
+    def insert_many(self, keys, fill_factor=1.0):
+        """
+        Carga em lote: os registros já presentes e as chaves novas são ordenados (sem
+        repetições) e a árvore é montada de baixo para cima, com as folhas preenchidas
+        até fill_factor da capacidade e cada página escrita uma única vez. Retorna o
+        io_cost gasto pela carga.
+        """
+        io_start = self.io_cost
+        records = sorted(set(self._drain()).union(keys))
+        self.num_records = len(records)
+        keys_per_node = max(self.min_keys, 1, min(self.max_keys, round(self.max_keys * fill_factor)))
+        
+        # folhas: grupos consecutivos de chaves, cada uma apontando para a próxima
+        sizes = chunk_sizes(len(records), keys_per_node, self.min_keys)
+        page_ids = [self.store.allocate() for _ in sizes]
+        # (página, menor chave da subárvore) de cada nó do nível sendo montado
+        level = []
+        start = 0
+        for i, (page_id, size) in enumerate(zip(page_ids, sizes)):
+            page = self.store.read(page_id)
+            page.overflow_page = page_ids[i + 1] if i + 1 < len(page_ids) else None
+            self._write(page_id, page, records[start:start + size])
+            level.append((page_id, records[start] if size else None))
+            start += size
+        
+        # níveis internos: cada nó agrupa filhos consecutivos, separados pelas suas menores chaves
+        self.height = 1
+        while len(level) > 1:
+            next_level = []
+            start = 0
+            for size in chunk_sizes(len(level), keys_per_node + 1, self.min_keys + 1):
+                group = level[start:start + size]
+                page_id = self.store.allocate()
+                self._write(page_id, self.store.read(page_id), [min_key for _, min_key in group[1:]],
+                            [child_id for child_id, _ in group])
+                next_level.append((page_id, group[0][1]))
+                start += size
+            level = next_level
+            self.height += 1
+        self.root = level[0][0]
+        return self.io_cost - io_start
+    
+    def get_space_usage(self):
+        return self.store.num_pages
+    
+    def memory_bytes(self):
+        """Bytes ocupados em memória pelas páginas (no store); a árvore não guarda mais nada fora delas."""
+        return self.store.memory_bytes()
+    
+    def save(self, path):
+        """Grava o estado e todas as páginas em um snapshot binário (persistencia.py)."""
+        save_snapshot(self, path, ())
+    
+    @classmethod
+    def load(cls, path, disk=False, buffer_pages=256, page_path=None):
+        """Restaura uma árvore gravada com save(); ver persistencia.load_snapshot."""
+        return load_snapshot(cls, path, disk=disk, buffer_pages=buffer_pages, page_path=page_path)
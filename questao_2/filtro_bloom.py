@@ -0,0 +1,148 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'questao_3'))
+from questao_3 import (BloomFilter, CountingBloomFilter, MERSENNE_PRIME_31, calculate_optimal_n,
+                       calculate_P_probability)
+
+class BloomGuard:
+    """
+    Filtro de Bloom (questao_3.py) mantido em memória na frente de uma tabela hash: uma
+    busca ou remoção cuja chave o filtro descarta retorna sem ler nenhuma página. Há um
+    filtro para a tabela inteira, dimensionado para `capacity` chaves com bits_per_key
+    bits de memória por chave (no filtro com contadores, bits_per_key / COUNTER_BITS
+    contadores por chave) e n = calculate_optimal_n; quando a tabela passa de capacity registros,
+    o filtro é refeito com o dobro da capacidade a partir dos registros das páginas.
+    """
+    
+    def __init__(self, bits_per_key=10, initial_capacity=1024, counting=True, seed=None):
+        """
+        bits_per_key: bits de memória do filtro por chave da capacidade
+        initial_capacity: número de chaves para o qual o primeiro filtro é dimensionado
+        counting: True (padrão): CountingBloomFilter, e remover uma chave da tabela a remove
+            do filtro, mas com a mesma memória ele tem COUNTER_BITS vezes menos posições e
+            mais falsos positivos; False: BloomFilter de bits, e as chaves removidas
+            continuam no filtro até a próxima reconstrução, gerando mais falsos positivos
+        seed: semente das funções hash do filtro (ver BloomFilter)
+        """
+        if bits_per_key <= 0:
+            raise ValueError("bits_per_key deve ser positivo")
+        if initial_capacity < 1:
+            raise ValueError("initial_capacity deve ser pelo menos 1")
+        self.bits_per_key = bits_per_key
+        self.initial_capacity = initial_capacity
+        self.counting = counting
+        self.seed = seed
+        self.num_checks = 0
+        self.num_rejections = 0
+        self.num_rebuilds = 0
+        self._build(initial_capacity)
+    
+    def _build(self, capacity):
+        self.capacity = capacity
+        filter_class = CountingBloomFilter if self.counting else BloomFilter
+        # m posições com bits_per_key * capacity bits de memória no total
+        bits_per_position = CountingBloomFilter.COUNTER_BITS if self.counting else 1
+        m = max(8, round(self.bits_per_key * capacity / bits_per_position))
+        self.filter = filter_class(m, max(1, calculate_optimal_n(m, capacity)), a_source='prime_field',
+                                   seed=self.seed)
+    
+    def add(self, key):
+        self.filter.insert(key)
+    
+    def discard(self, key):
+        if self.counting:
+            self.filter.remove(key)
+    
+    def might_contain(self, key):
+        """False se a chave certamente não está na tabela."""
+        self.num_checks += 1
+        if self.filter.contains(key):
+            return True
+        self.num_rejections += 1
+        return False
+    
+    def needs_rebuild(self, num_records):
+        return num_records > self.capacity
+    
+    def rebuild(self, records):
+        """Refaz o filtro só com records, com capacidade dobrada até caberem todos."""
+        capacity = self.initial_capacity
+        while capacity < len(records):
+            capacity *= 2
+        self._build(capacity)
+        self.filter.insert_many(np.array(records, dtype=np.uint64))
+        self.num_rebuilds += 1
+    
+    def expected_fp_rate(self, num_records):
+        """P do filtro atual com num_records chaves (questao_3.calculate_P_probability)."""
+        return calculate_P_probability(self.filter.m, self.filter.n, num_records)
+    
+    def memory_bytes(self):
+        return self.filter.memory_bytes()
+    
+    def get_stats(self):
+        return {
+            'capacity': self.capacity,
+            'm': self.filter.m,
+            'n': self.filter.n,
+            'memory_bytes': self.memory_bytes(),
+            'num_checks': self.num_checks,
+            'num_rejections': self.num_rejections,
+            'num_rebuilds': self.num_rebuilds
+        }
+    
+    def get_state(self):
+        """
+        (estado, bytes) do guard para um snapshot: os parâmetros e contadores em valores
+        serializáveis em JSON e o vetor de bits (ou de contadores) do filtro.
+        """
+        bloom = self.filter
+        state = {
+            'bits_per_key': self.bits_per_key,
+            'initial_capacity': self.initial_capacity,
+            'counting': self.counting,
+            'seed': self.seed,
+            'capacity': self.capacity,
+            'num_checks': self.num_checks,
+            'num_rejections': self.num_rejections,
+            'num_rebuilds': self.num_rebuilds,
+            'filter': {
+                'm': bloom.m,
+                'n': bloom.n,
+                'hash_scheme': bloom.hash_scheme,
+                'a_source': bloom.a_source,
+                'seed': bloom.seed,
+                'hash_params': bloom.hash_params
+            }
+        }
+        return state, bytes(bloom.counters if self.counting else bloom.bit_array)
+    
+    @classmethod
+    def from_state(cls, state, data):
+        """Reconstrói um guard a partir de get_state(), sem reinserir as chaves."""
+        guard = cls.__new__(cls)
+        for name in ('bits_per_key', 'initial_capacity', 'counting', 'seed', 'capacity', 'num_checks',
+                     'num_rejections', 'num_rebuilds'):
+            setattr(guard, name, state[name])
+        
+        params = state['filter']
+        filter_class = CountingBloomFilter if guard.counting else BloomFilter
+        bloom = filter_class.__new__(filter_class)
+        bloom.m = params['m']
+        bloom.n = params['n']
+        bloom.hash_scheme = params['hash_scheme']
+        bloom.a_source = params['a_source']
+        bloom.seed = params['seed']
+        bloom.modulus = MERSENNE_PRIME_31 if bloom.a_source == 'prime_field' else bloom.m
+        bloom.hash_params = [{'a': p['a'], 'b': p['b']} for p in params['hash_params']]
+        bloom.mapping = None
+        bloom._build_hash_columns()
+        if guard.counting:
+            bloom.counters = bytearray(data)
+        else:
+            bloom.bit_array = bytearray(data)
+        guard.filter = bloom
+        return guard
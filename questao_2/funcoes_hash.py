@@ -0,0 +1,170 @@
+import random
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+MASK_64 = (1 << 64) - 1
+
+class HashFunction(ABC):
+    """
+    Interface das famílias de funções hash usadas pelas tabelas: h(key) devolve um
+    inteiro de `bits` bits e hash_many(keys) calcula o mesmo para um vetor NumPy de
+    chaves de uma vez (resultado em np.uint64).
+    """
+    name = None
+    bits = 64
+    
+    @abstractmethod
+    def __call__(self, key):
+        """Hash de uma chave inteira."""
+    
+    @abstractmethod
+    def hash_many(self, keys):
+        """Hash de um vetor de chaves, como np.uint64."""
+    
+    def get_params(self):
+        """Parâmetros da função, serializáveis em JSON; from_params(get_params()) a reconstrói."""
+        return {}
+    
+    @classmethod
+    def from_params(cls, params):
+        return cls(**params)
+
+class IdentityHash(HashFunction):
+    """A própria chave (o hash linear original usa key % (N * 2^level))."""
+    name = 'identidade'
+    
+    def __call__(self, key):
+        return key
+    
+    def hash_many(self, keys):
+        return np.asarray(keys).astype(np.uint64)
+
+class MultiplicativeHash(HashFunction):
+    """
+    Método multiplicativo de Knuth: (key * a) mod 2^bits. Os bits baixos do resultado
+    dependem só dos bits baixos da chave.
+    """
+    name = 'multiplicativa'
+    
+    def __init__(self, bits=32, multiplier=2654435761):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.multiplier = multiplier
+    
+    def __call__(self, key):
+        return (key * self.multiplier) & self.mask
+    
+    def hash_many(self, keys):
+        keys = np.asarray(keys).astype(np.uint64)
+        return (keys * np.uint64(self.multiplier)) & np.uint64(self.mask)
+    
+    def get_params(self):
+        return {'bits': self.bits, 'multiplier': self.multiplier}
+
+class MultiplyShiftHash(HashFunction):
+    """
+    Multiply-shift de Dietzfelbinger: ((a * key + b) mod 2^64) >> (64 - bits), com a
+    ímpar e b sorteados; usa os bits altos do produto, que dependem de toda a chave.
+    """
+    name = 'multiply-shift'
+    
+    def __init__(self, bits=32, seed=None):
+        rng = random.Random(seed)
+        self.bits = bits
+        self.shift = 64 - bits
+        self.a = rng.getrandbits(64) | 1
+        self.b = rng.getrandbits(64)
+    
+    def __call__(self, key):
+        return (((self.a * key + self.b) & MASK_64) >> self.shift)
+    
+    def hash_many(self, keys):
+        keys = np.asarray(keys).astype(np.uint64)
+        return (keys * np.uint64(self.a) + np.uint64(self.b)) >> np.uint64(self.shift)
+    
+    def get_params(self):
+        return {'bits': self.bits, 'a': self.a, 'b': self.b}
+    
+    @classmethod
+    def from_params(cls, params):
+        function = cls.__new__(cls)
+        function.bits = params['bits']
+        function.shift = 64 - params['bits']
+        function.a = params['a']
+        function.b = params['b']
+        return function
+
+class TabulationHash(HashFunction):
+    """
+    Tabulação simples: a chave de 64 bits é dividida em 8 bytes e o hash é o XOR de
+    T_i[byte_i], com 8 tabelas de 256 valores aleatórios de `bits` bits.
+    """
+    name = 'tabulacao'
+    
+    def __init__(self, bits=32, seed=None):
+        rng = random.Random(seed)
+        self.bits = bits
+        self.tables = [[rng.getrandbits(bits) for _ in range(256)] for _ in range(8)]
+        self.np_tables = np.array(self.tables, dtype=np.uint64)
+    
+    def __call__(self, key):
+        h = 0
+        for table in self.tables:
+            h ^= table[key & 0xFF]
+            key >>= 8
+        return h
+    
+    def hash_many(self, keys):
+        keys = np.asarray(keys).astype(np.uint64)
+        h = np.zeros(keys.shape, dtype=np.uint64)
+        for i in range(8):
+            h ^= self.np_tables[i][(keys >> np.uint64(8 * i)) & np.uint64(0xFF)]
+        return h
+    
+    def get_params(self):
+        return {'bits': self.bits, 'tables': self.tables}
+    
+    @classmethod
+    def from_params(cls, params):
+        function = cls.__new__(cls)
+        function.bits = params['bits']
+        function.tables = params['tables']
+        function.np_tables = np.array(function.tables, dtype=np.uint64)
+        return function
+
+class Mix64Hash(HashFunction):
+    """Finalizador do splitmix64 (misturador de 64 bits) aplicado a key + semente."""
+    name = 'mix64'
+    
+    def __init__(self, seed=0):
+        self.seed = seed & MASK_64
+    
+    def __call__(self, key):
+        h = (key + self.seed) & MASK_64
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK_64
+        return h ^ (h >> 31)
+    
+    def hash_many(self, keys):
+        h = np.asarray(keys).astype(np.uint64) + np.uint64(self.seed)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return h ^ (h >> np.uint64(31))
+    
+    def get_params(self):
+        return {'seed': self.seed}
+
+HASH_FAMILIES = {
+    family.name: family
+    for family in (IdentityHash, MultiplicativeHash, MultiplyShiftHash, TabulationHash, Mix64Hash)
+}
+
+def make_hash_function(name, seed=None):
+    """Instancia a família name com os parâmetros padrão (e semente, quando houver)."""
+    family = HASH_FAMILIES[name]
+    if family in (MultiplyShiftHash, TabulationHash):
+        return family(seed=seed)
+    if family is Mix64Hash:
+        return family(seed=seed or 0)
+    return family()
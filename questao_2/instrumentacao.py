@@ -0,0 +1,106 @@
+import functools
+import math
+import time
+from array import array
+
+class OperationRecorder:
+    """
+    Coleta, por tipo de operação, o tempo de relógio e o número de páginas tocadas
+    (acréscimo de io_cost) de cada chamada, e um trace dos eventos estruturais da
+    tabela (splits, duplicações, mudanças de level, páginas de overflow...) com o
+    número de registros no momento de cada evento.
+    """
+
+    def __init__(self, trace_events=True):
+        """trace_events: se False, só as operações são registradas"""
+        self.trace_events = trace_events
+        self.times = {}
+        self.pages = {}
+        self.events = []
+
+    def record(self, operation, elapsed, pages):
+        if operation not in self.times:
+            self.times[operation] = array('d')
+            self.pages[operation] = array('l')
+        self.times[operation].append(elapsed)
+        self.pages[operation].append(pages)
+
+    def event(self, kind, num_records, **details):
+        if self.trace_events:
+            self.events.append({'event': kind, 'num_records': num_records, **details})
+
+    def event_counts(self):
+        counts = {}
+        for event in self.events:
+            counts[event['event']] = counts.get(event['event'], 0) + 1
+        return counts
+
+    def summary(self):
+        """
+        Por operação: número de chamadas, p50/p99/máximo/média do tempo (em
+        microssegundos) e das páginas tocadas, e os histogramas das duas medidas.
+        """
+        summary = {}
+        for operation, times in self.times.items():
+            micros = [elapsed * 1e6 for elapsed in times]
+            pages = self.pages[operation]
+            summary[operation] = {
+                'count': len(times),
+                'time_us': percentiles(micros),
+                'pages': percentiles(pages),
+                'time_histogram': log2_histogram(micros),
+                'pages_histogram': value_histogram(pages)
+            }
+        return summary
+
+    def to_dict(self, include_events=False):
+        """Resumo das operações e contagem dos eventos; include_events acrescenta o trace inteiro."""
+        result = {'operations': self.summary(), 'event_counts': self.event_counts()}
+        if include_events:
+            result['events'] = self.events
+        return result
+
+def percentiles(values):
+    """p50, p99, máximo e média de uma amostra (percentil pelo posto mais próximo)."""
+    if not values:
+        return {'p50': 0, 'p99': 0, 'max': 0, 'mean': 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+    return {'p50': rank(0.50), 'p99': rank(0.99), 'max': ordered[-1], 'mean': sum(ordered) / len(ordered)}
+
+def value_histogram(values):
+    """Número de ocorrências de cada valor (chaves em texto, para o JSON)."""
+    histogram = {}
+    for value in values:
+        histogram[value] = histogram.get(value, 0) + 1
+    return {str(value): histogram[value] for value in sorted(histogram)}
+
+def log2_histogram(values):
+    """Número de valores em cada faixa [2^i, 2^(i+1)), indexada pelo limite inferior."""
+    histogram = {}
+    for value in values:
+        bucket = 0 if value < 1 else 1 << int(math.log2(value))
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    return {str(bucket): histogram[bucket] for bucket in sorted(histogram)}
+
+def instrumented(operation):
+    """
+    Decora um método de tabela hash para que, quando a tabela tiver um recorder,
+    cada chamada registre o tempo gasto e o acréscimo de io_cost sob operation.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            recorder = self.recorder
+            if recorder is None:
+                return method(self, *args, **kwargs)
+            io_start = self.io_cost
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            recorder.record(operation, time.perf_counter() - start, self.io_cost - io_start)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,153 @@
+import traceback
+from multiprocessing import Pipe, Process
+
+import numpy as np
+
+from funcoes_hash import Mix64Hash
+
+def _shard_main(connection, table_class, table_options):
+    """
+    Laço de um processo de shard: cria a sua tabela, recebe (comando, argumento) pelo
+    pipe, aplica na tabela e devolve ('ok', resultado) ou ('error', traceback).
+    """
+    try:
+        table = table_class(**table_options)
+    except Exception:
+        connection.send(('error', traceback.format_exc()))
+        connection.close()
+        return
+    connection.send(('ok', None))
+    
+    while True:
+        command, payload = connection.recv()
+        if command == 'close':
+            connection.close()
+            return
+        try:
+            if command == 'insert_many':
+                keys, bulk = payload
+                keys = np.frombuffer(keys, dtype=np.uint64).tolist()
+                if bulk:
+                    table.insert_many(keys)
+                else:
+                    for key in keys:
+                        table.insert(key)
+                result = None
+            elif command == 'search_many':
+                keys = np.frombuffer(payload, dtype=np.uint64).tolist()
+                result = np.array([table.search(key) for key in keys], dtype=np.bool_).tobytes()
+            elif command == 'stats':
+                result = {
+                    'io_cost': table.io_cost,
+                    'space': table.get_space_usage(),
+                    'num_records': table.num_records,
+                    'memory_bytes': table.memory_bytes()
+                }
+            else:
+                raise ValueError(f"Comando desconhecido: {command}")
+            connection.send(('ok', result))
+        except Exception:
+            connection.send(('error', traceback.format_exc()))
+
+class ShardedHashTable:
+    """
+    Tabela particionada entre num_shards processos, cada um com a sua própria instância
+    de table_class (ExtensibleHashing ou LinearHashing). Cada chave vai para o shard
+    indicado pelos bits altos de um hash de 64 bits, independente do hash usado dentro
+    das tabelas; os lotes de chaves seguem pelos pipes como vetores de uint64.
+    """
+    
+    def __init__(self, table_class, num_shards, routing_hash=None, **table_options):
+        """
+        table_class: classe da tabela de cada shard
+        num_shards: número de processos
+        routing_hash: função hash de 64 bits que escolhe o shard (padrão: Mix64Hash)
+        table_options: parâmetros repassados a table_class em cada shard
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards deve ser pelo menos 1")
+        self.num_shards = num_shards
+        self.routing_hash = Mix64Hash() if routing_hash is None else routing_hash
+        self.connections = []
+        self.processes = []
+        for _ in range(num_shards):
+            parent_end, child_end = Pipe()
+            process = Process(target=_shard_main, args=(child_end, table_class, table_options), daemon=True)
+            process.start()
+            child_end.close()
+            self.connections.append(parent_end)
+            self.processes.append(process)
+        
+        # cada shard confirma que criou a sua tabela (ou devolve o erro do construtor)
+        try:
+            self._collect()
+        except RuntimeError:
+            self.close()
+            raise
+    
+    def shard_of_many(self, keys):
+        """Shard de cada chave: (32 bits altos do hash * num_shards) >> 32."""
+        high_bits = self.routing_hash.hash_many(keys) >> np.uint64(32)
+        return ((high_bits * np.uint64(self.num_shards)) >> np.uint64(32)).astype(np.intp)
+    
+    def _partition(self, keys):
+        """Ordena as chaves por shard; retorna (ordem, fatias de chaves por shard)."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        shards = self.shard_of_many(keys)
+        order = np.argsort(shards, kind='stable')
+        bounds = np.cumsum(np.bincount(shards, minlength=self.num_shards))[:-1]
+        return order, np.split(keys[order], bounds)
+    
+    def _broadcast(self, messages):
+        # envia para todos os shards antes de esperar, para que trabalhem em paralelo
+        for connection, message in zip(self.connections, messages):
+            connection.send(message)
+        return self._collect()
+    
+    def _collect(self):
+        results = []
+        for shard, connection in enumerate(self.connections):
+            status, result = connection.recv()
+            if status == 'error':
+                raise RuntimeError(f"Erro no shard {shard}:\n{result}")
+            results.append(result)
+        return results
+    
+    def insert_many(self, keys, bulk=False):
+        """
+        Insere um lote de chaves. Com bulk=True cada shard usa o insert_many (carga em
+        lote) da sua tabela; caso contrário, insere as chaves uma a uma.
+        """
+        _, shard_keys = self._partition(keys)
+        self._broadcast([('insert_many', (chunk.tobytes(), bulk)) for chunk in shard_keys])
+    
+    def search_many(self, keys):
+        """Busca um lote de chaves; retorna um vetor de bool na ordem das chaves."""
+        order, shard_keys = self._partition(keys)
+        results = self._broadcast([('search_many', chunk.tobytes()) for chunk in shard_keys])
+        found = np.empty(len(order), dtype=np.bool_)
+        found[order] = np.concatenate([np.frombuffer(result, dtype=np.bool_) for result in results])
+        return found
+    
+    def get_stats(self):
+        """Totais de io_cost, espaço, registros e memória, mais os valores de cada shard."""
+        shards = self._broadcast([('stats', None)] * self.num_shards)
+        totals = {metric: sum(shard[metric] for shard in shards) for metric in shards[0]}
+        return {**totals, 'shards': shards}
+    
+    def close(self):
+        for connection, process in zip(self.connections, self.processes):
+            if not connection.closed:
+                try:
+                    connection.send(('close', None))
+                except BrokenPipeError:
+                    # o shard já terminou (falhou ao criar a tabela)
+                    pass
+                connection.close()
+            process.join()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
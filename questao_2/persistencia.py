@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+import struct
+from array import array
+
+from armazenamento import MemoryPageStore, DiskPageStore, page_slot_size
+from funcoes_hash import HASH_FAMILIES
+from filtro_bloom import BloomGuard
+
+# Formato do snapshot:
+#   SNAPSHOT_PREFIX: assinatura, versão e tamanho dos metadados
+#   metadados (JSON): os SNAPSHOT_FIELDS da tabela, a família e os parâmetros da função
+#   hash, o estado do guard e a descrição dos vetores
+#   vetores da tabela (diretório, profundidades locais, buckets...), páginas livres e o
+#   vetor do filtro do guard, em bytes
+#   preenchimento até um múltiplo de SNAPSHOT_ALIGNMENT, para que load_snapshot(disk=True)
+#   mapeie as páginas direto do snapshot a partir de um limite de página do sistema
+#   slots de todas as páginas, no mesmo formato do arquivo do DiskPageStore
+SNAPSHOT_MAGIC = b'EDA2HASH'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_PREFIX = struct.Struct('<8sIq')
+SNAPSHOT_ALIGNMENT = 4096
+
+def save_snapshot(table, path, array_names):
+    """
+    Grava table em path: os atributos de table.SNAPSHOT_FIELDS (números, None, texto e
+    listas ou dicionários deles) em JSON, os vetores de array_names (atributos
+    array.array da tabela) em binário, a função hash e o guard pelos seus parâmetros,
+    se a tabela os tiver, e todas as páginas do store. Nenhum objeto é serializado
+    com pickle, então abrir um snapshot não executa código.
+    """
+    store = table.store
+    arrays = {name: getattr(table, name) for name in array_names}
+    arrays['free_pages'] = array('q', store.free_pages)
+    state = {}
+    dict_fields = []
+    for name in table.SNAPSHOT_FIELDS:
+        value = getattr(table, name)
+        if isinstance(value, dict):
+            # as chaves de um objeto JSON são texto; os dicionários vão como lista de pares
+            value = sorted(value.items())
+            dict_fields.append(name)
+        state[name] = value
+    
+    metadata = {
+        'structure': type(table).__name__,
+        'page_capacity': store.page_capacity,
+        'num_page_ids': store.page_id_bound(),
+        'state': state,
+        'dict_fields': dict_fields
+    }
+    # as chaves 'hash_function' e 'guard' só existem para as tabelas que têm esses atributos
+    if hasattr(table, 'hash_function'):
+        metadata['hash_function'] = {
+            'family': table.hash_function.name,
+            'params': table.hash_function.get_params()
+        }
+    if hasattr(table, 'guard'):
+        metadata['guard'] = None
+        if table.guard is not None:
+            metadata['guard'], guard_filter = table.guard.get_state()
+            arrays['guard_filter'] = array('B', guard_filter)
+    metadata['arrays'] = [(name, values.typecode, values.itemsize, len(values)) for name, values in arrays.items()]
+    metadata_bytes = json.dumps(metadata).encode()
+    
+    with open(path, 'wb') as f:
+        f.write(SNAPSHOT_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(metadata_bytes)))
+        f.write(metadata_bytes)
+        for values in arrays.values():
+            values.tofile(f)
+        f.write(bytes(-f.tell() % SNAPSHOT_ALIGNMENT))
+        store.dump_pages(f)
+
+def load_snapshot(table_class, path, disk=False, buffer_pages=256, page_path=None):
+    """
+    Reconstrói uma tabela de table_class gravada por save_snapshot.
+    disk=False: os slots das páginas são lidos de uma vez para um MemoryPageStore.
+    disk=True: o DiskPageStore mapeia os slots direto do snapshot, a partir da região
+        alinhada, em modo cópia na escrita: nada é copiado, as páginas só são lidas sob
+        demanda pelo buffer pool e o snapshot não é alterado. Com page_path, os slots são
+        copiados para esse arquivo, que passa a ser um arquivo de páginas independente.
+    """
+    with open(path, 'rb') as f:
+        magic, version, metadata_size = SNAPSHOT_PREFIX.unpack(f.read(SNAPSHOT_PREFIX.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} não é um snapshot de tabela hash")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Versão de snapshot não suportada: {version}")
+        metadata = json.loads(f.read(metadata_size))
+        if metadata['structure'] != table_class.__name__:
+            raise ValueError(f"O snapshot contém um {metadata['structure']}, não um {table_class.__name__}")
+        if set(metadata['state']) != set(table_class.SNAPSHOT_FIELDS):
+            raise ValueError(f"Os campos do snapshot não correspondem aos de {table_class.__name__}")
+        
+        arrays = {}
+        for name, typecode, itemsize, length in metadata['arrays']:
+            values = array(typecode)
+            if values.itemsize != itemsize:
+                raise ValueError(f"O vetor {name} foi gravado com inteiros de {itemsize} bytes")
+            values.fromfile(f, length)
+            arrays[name] = values
+        f.seek(-f.tell() % SNAPSHOT_ALIGNMENT, os.SEEK_CUR)
+        
+        page_capacity = metadata['page_capacity']
+        num_page_ids = metadata['num_page_ids']
+        free_pages = arrays.pop('free_pages').tolist()
+        if disk and page_path is None:
+            store = DiskPageStore(page_capacity, path, buffer_pages=buffer_pages, num_page_ids=num_page_ids,
+                                  free_pages=free_pages, offset=f.tell(), copy_on_write=True)
+        elif disk:
+            with open(page_path, 'wb') as pages_file:
+                shutil.copyfileobj(f, pages_file)
+            store = DiskPageStore(page_capacity, page_path, buffer_pages=buffer_pages, temporary=False,
+                                  num_page_ids=num_page_ids, free_pages=free_pages)
+        else:
+            data = f.read(num_page_ids * page_slot_size(page_capacity))
+            store = MemoryPageStore.from_slots(page_capacity, data, num_page_ids, free_pages)
+    
+    table = table_class.__new__(table_class)
+    for name, value in metadata['state'].items():
+        if name in metadata['dict_fields']:
+            value = {key: item for key, item in value}
+        setattr(table, name, value)
+    if 'hash_function' in metadata:
+        hash_function = metadata['hash_function']
+        table.hash_function = HASH_FAMILIES[hash_function['family']].from_params(hash_function['params'])
+    if 'guard' in metadata:
+        table.guard = None
+        if metadata['guard'] is not None:
+            table.guard = BloomGuard.from_state(metadata['guard'], arrays.pop('guard_filter').tobytes())
+    for name, values in arrays.items():
+        setattr(table, name, values)
+    table.store = store
+    table.recorder = None
+    return table
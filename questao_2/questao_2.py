@@ -1,266 +1,1033 @@
 import random
 import json
+import gc
+import time
+import argparse
+import math
+import os
+import sys
+import tempfile
+from array import array
 
-class Page:
-    def __init__(self, capacity):
-        self.capacity = capacity
-        self.records = []
-        self.overflow_page = None
-    
-    def is_full(self):
-        return len(self.records) >= self.capacity
-    
-    def insert(self, record):
-        if not self.is_full():
-            self.records.append(record)
-            return True
-        return False
+import numpy as np
+
+from armazenamento import MemoryPageStore, DiskPageStore
+from funcoes_hash import IdentityHash, MultiplicativeHash, HASH_FAMILIES, make_hash_function
+from instrumentacao import OperationRecorder, instrumented
+from particionado import ShardedHashTable
+from persistencia import save_snapshot, load_snapshot
+from filtro_bloom import BloomGuard
+from arvore_b import BPlusTree
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from experimentos import run_grid, summarize, stream_random_keys
+from colunar import ColumnStore
+
+# curvas por checkpoint do experimento padrão (ColumnStore, ver colunar.py)
+CURVES_STORE = 'questao_2_curvas'
+
+def search_chain(store, page_id):
+    """Gera as páginas da cadeia de overflow iniciada em page_id (incluindo a própria)."""
+    while page_id is not None:
+        page = store.read(page_id)
+        yield page
+        page_id = page.overflow_page
+
+def delete_from_chain(store, page_id, key):
+    """
+    Remove key da cadeia iniciada em page_id, preenchendo o buraco com um registro da
+    última página da cadeia, que é desencadeada e liberada se ficar vazia.
+    Retorna (páginas lidas, páginas escritas, removido, página de overflow liberada).
+    """
+    reads = 0
+    hole_id = None
+    hole_page = None
+    previous_id = None
+    current_id = page_id
+    while True:
+        current_page = store.read(current_id)
+        reads += 1
+        if hole_page is None and current_page.remove(key):
+            hole_id, hole_page = current_id, current_page
+        if current_page.overflow_page is None:
+            break
+        previous_id = current_id
+        current_id = current_page.overflow_page
+    
+    if hole_page is None:
+        return reads, 0, False, False
     
-    def __repr__(self):
-        return f"Page(records={self.records})"
+    writes = 1
+    if current_id != hole_id and len(current_page):
+        hole_page.insert(current_page.pop())
+        store.write(current_id, current_page)
+        writes += 1
+    store.write(hole_id, hole_page)
+    
+    freed = previous_id is not None and not len(current_page)
+    if freed:
+        store.free(current_id)
+        previous_page = store.read(previous_id)
+        previous_page.overflow_page = None
+        store.write(previous_id, previous_page)
+        writes += 1
+    return reads, writes, True, freed
+
+def write_chain(store, records, capacity, head_id=None, spare_ids=None):
+    """
+    Grava records em uma cadeia compacta de páginas cheias (só a última pode ficar
+    incompleta). head_id reaproveita uma página como início da cadeia e spare_ids é uma
+    lista de páginas que podem ser reaproveitadas antes de alocar novas (as usadas são
+    retiradas da lista). Retorna (identificador da primeira página, páginas escritas).
+    """
+    if head_id is None:
+        head_id = store.allocate()
+    page_id = head_id
+    pages_written = 0
+    start = 0
+    while True:
+        page = store.read(page_id)
+        page.records = records[start:start + capacity]
+        start += capacity
+        if start < len(records):
+            page.overflow_page = spare_ids.pop() if spare_ids else store.allocate()
+        else:
+            page.overflow_page = None
+        store.write(page_id, page)
+        pages_written += 1
+        if page.overflow_page is None:
+            return head_id, pages_written
+        page_id = page.overflow_page
+
+def read_chain(store, page_id):
+    """Retorna (identificadores das páginas, registros) da cadeia iniciada em page_id."""
+    page_ids = []
+    records = []
+    while page_id is not None:
+        page = store.read(page_id)
+        page_ids.append(page_id)
+        records.extend(page.records)
+        page_id = page.overflow_page
+    return page_ids, records
+
+def chain_lengths(store, head_ids):
+    """Número de páginas de cada cadeia (sem contar I/O na tabela)."""
+    return [len(read_chain(store, head_id)[0]) for head_id in head_ids]
+
+def drain_chain(store, page_id):
+    """Lê todos os registros da cadeia de page_id e libera as suas páginas."""
+    page_ids, records = read_chain(store, page_id)
+    for chain_page_id in page_ids:
+        store.free(chain_page_id)
+    return records
 
 class ExtensibleHashing:
-    def __init__(self, page_capacity):
+    # estado escalar gravado no snapshot (persistencia.py), além da função hash, do guard,
+    # do diretório e das profundidades locais
+    SNAPSHOT_FIELDS = ('page_capacity', 'max_global_depth', 'global_depth', 'depth_counts', 'pending',
+                       'doubling_step', 'num_records', 'num_overflow_pages', 'num_splits', 'num_doublings',
+                       'io_cost')
+    
+    def __init__(self, page_capacity, max_global_depth=24, store=None, hash_function=None, recorder=None,
+                 doubling_step=None, guard=None):
+        """
+        page_capacity: número de registros por página
+        max_global_depth: profundidade máxima do diretório (até o número de bits do hash);
+            páginas que precisariam ultrapassá-la passam a usar páginas de overflow encadeadas
+        store: onde as páginas são guardadas (padrão: MemoryPageStore, ver armazenamento.py)
+        hash_function: função hash (padrão: MultiplicativeHash de 32 bits, ver funcoes_hash.py)
+        recorder: OperationRecorder opcional (instrumentacao.py) que recebe o tempo e as
+            páginas tocadas de cada operação e os eventos estruturais
+        doubling_step: se definido, a duplicação do diretório é incremental: cada inserção
+            ou remoção copia no máximo doubling_step entradas da metade nova (padrão: None,
+            a duplicação copia o diretório inteiro de uma vez)
+        guard: BloomGuard opcional (filtro_bloom.py) consultado antes de buscas e remoções;
+            as chaves que ele descarta retornam False sem ler nenhuma página
+        """
+        if doubling_step is not None and doubling_step < 1:
+            raise ValueError("doubling_step deve ser pelo menos 1")
+        self.hash_function = MultiplicativeHash() if hash_function is None else hash_function
+        if not 1 <= max_global_depth <= self.hash_function.bits:
+            raise ValueError(f"max_global_depth deve estar entre 1 e {self.hash_function.bits}")
         self.page_capacity = page_capacity
+        self.max_global_depth = max_global_depth
         self.global_depth = 1
-        self.pages = [Page(page_capacity), Page(page_capacity)]
-        self.directory = {
-            '0': {'page_index': 0, 'local_depth': 1},
-            '1': {'page_index': 1, 'local_depth': 1}
-        }
+        self.store = MemoryPageStore(page_capacity) if store is None else store
+        # profundidade local de cada página, indexada pelo identificador da página no store
+        self.local_depths = array('B')
+        # quantas páginas existem com cada profundidade local (decide quando o diretório pode encolher)
+        self.depth_counts = [0] * (max_global_depth + 1)
+        # diretório: vetor de identificadores de página indexado por hash & ((1 << global_depth) - 1).
+        # Na duplicação incremental só as primeiras len(directory) entradas existem; uma entrada
+        # além delas vale o mesmo que a entrada sem o seu bit mais alto, exceto as que um split
+        # ou uma junção já alterou, guardadas em pending até serem copiadas
+        self.directory = array('l', [self._allocate_page(1), self._allocate_page(1)])
+        self.pending = {}
+        self.doubling_step = doubling_step
+        self.num_records = 0
+        self.num_overflow_pages = 0
+        self.num_splits = 0
+        self.num_doublings = 0
         self.io_cost = 0
+        self.recorder = recorder
+        self.guard = guard
     
     def hash(self, key):
-        h = (key * 2654435761) & 0xFFFFFFFF
-        return format(h, '032b')
+        return self.hash_function(key)
+    
+    def _emit(self, kind, **details):
+        if self.recorder is not None:
+            self.recorder.event(kind, self.num_records, **details)
     
     def get_dir_key(self, key_hash):
-        return key_hash[-self.global_depth:]
+        return key_hash & ((1 << self.global_depth) - 1)
+    
+    def _page_at(self, d_key):
+        directory = self.directory
+        while d_key >= len(directory):
+            page_id = self.pending.get(d_key)
+            if page_id is not None:
+                return page_id
+            d_key -= 1 << (d_key.bit_length() - 1)
+        return directory[d_key]
+    
+    def _set_slots(self, first_slot, stride, page_id):
+        """
+        Aponta para page_id as entradas first_slot, first_slot + stride, ... do diretório.
+        Como first_slot < stride, entre as entradas ainda não copiadas só first_slot pode
+        diferir da entrada sem o bit mais alto; as demais passam a segui-la e perdem
+        qualquer valor pendente.
+        """
+        directory = self.directory
+        for d_key in range(first_slot, len(directory), stride):
+            directory[d_key] = page_id
+        if first_slot >= len(directory):
+            self.pending[first_slot] = page_id
+        
+        pending = self.pending
+        if len(pending) > 1 or (pending and first_slot not in pending):
+            start = max(first_slot + stride, len(directory))
+            start += (first_slot - start) % stride
+            size = 1 << self.global_depth
+            if (size - start) // stride < len(pending):
+                for d_key in range(start, size, stride):
+                    pending.pop(d_key, None)
+            else:
+                for d_key in [d_key for d_key in pending if d_key >= start and d_key % stride == first_slot]:
+                    del pending[d_key]
     
+    def _migrate_directory(self, num_slots):
+        """Copia até num_slots entradas pendentes da duplicação incremental."""
+        directory = self.directory
+        end = min(len(directory) + num_slots, 1 << self.global_depth)
+        for d_key in range(len(directory), end):
+            page_id = self.pending.pop(d_key, None)
+            if page_id is None:
+                page_id = directory[d_key - (1 << (d_key.bit_length() - 1))]
+            directory.append(page_id)
+    
+    def _page_ids(self):
+        return set(self.directory) | set(self.pending.values())
+    
+    @instrumented('insert')
     def insert(self, key):
         key_hash = self.hash(key)
+        self.num_records += 1
+        if self.guard is not None:
+            self._guard_insert(key)
+        if len(self.directory) < (1 << self.global_depth):
+            self._migrate_directory(self.doubling_step)
         
         while True:
-            dir_key = self.get_dir_key(key_hash)
-            entry = self.directory[dir_key]
-            page_index = entry['page_index']
-            page = self.pages[page_index]
+            page_id = self._page_at(self.get_dir_key(key_hash))
+            page = self.store.read(page_id)
             self.io_cost += 1
             
             if not page.is_full():
                 page.insert(key)
+                self.store.write(page_id, page)
                 self.io_cost += 1
                 return
             
             self.io_cost += 1
             
-            local_depth = entry['local_depth']
+            local_depth = self.local_depths[page_id]
+            
+            if local_depth == self.max_global_depth:
+                self._insert_overflow(page_id, page, key)
+                return
             
             if local_depth == self.global_depth:
                 self._double_directory()
             
-            new_page = Page(self.page_capacity)
-            self.pages.append(new_page)
-            new_page_index = len(self.pages) - 1
+            new_local_depth = local_depth + 1
+            new_page_id = self._allocate_page(new_local_depth)
+            self.num_splits += 1
             self.io_cost += 1
             
-            new_local_depth = local_depth + 1
+            self.local_depths[page_id] = new_local_depth
+            self.depth_counts[local_depth] -= 1
+            self.depth_counts[new_local_depth] += 1
+            
+            # as entradas que apontam para a página são as que compartilham os
+            # local_depth bits baixos do hash; das 2^(global-local) entradas, as que
+            # têm o bit local_depth ligado passam para a página nova
+            split_bit = 1 << local_depth
+            first_slot = (key_hash & (split_bit - 1)) | split_bit
+            self._set_slots(first_slot, 1 << new_local_depth, new_page_id)
+            
+            kept_records = []
+            moved_records = []
+            for record in page.records:
+                if self.hash(record) & split_bit:
+                    moved_records.append(record)
+                else:
+                    kept_records.append(record)
+            page.records = kept_records
+            self.store.write(page_id, page)
+            new_page = self.store.read(new_page_id)
+            new_page.records = moved_records
+            self.store.write(new_page_id, new_page)
+            self._emit('split', page=page_id, new_page=new_page_id, local_depth=new_local_depth,
+                       moved=len(moved_records))
+    
+    def insert_many(self, keys):
+        """
+        Carga em lote: os registros já presentes e as chaves novas são particionados
+        pelo hash com o diretório já dimensionado para o total, e cada página é
+        escrita uma única vez. Retorna o io_cost gasto pela carga.
+        """
+        io_start = self.io_cost
+        capacity = self.page_capacity
+        
+        # cada página viva é lida uma vez para recuperar os registros existentes
+        self.io_cost += self.store.num_pages
+        records = []
+        for page_id in self._page_ids():
+            records.extend(drain_chain(self.store, page_id))
+        records.extend(keys)
+        self.num_records = len(records)
+        if self.guard is not None:
+            self.guard.rebuild(records)
+        
+        depth = 1
+        while depth < self.max_global_depth and (capacity << depth) < len(records):
+            depth += 1
+        
+        groups = [[] for _ in range(1 << depth)]
+        slots = self.hash_function.hash_many(np.array(records, dtype=np.uint64)) & np.uint64((1 << depth) - 1)
+        for key, slot in zip(records, slots.tolist()):
+            groups[slot].append(key)
+        
+        # grupos que não cabem em uma página são divididos pelos bits seguintes do hash
+        leaves = []
+        pending = [(prefix, depth, group) for prefix, group in enumerate(groups)]
+        while pending:
+            prefix, group_depth, group = pending.pop()
+            if len(group) <= capacity or group_depth == self.max_global_depth:
+                leaves.append((prefix, group_depth, group))
+                continue
+            split_bit = 1 << group_depth
+            low, high = [], []
+            for key in group:
+                (high if self.hash(key) & split_bit else low).append(key)
+            pending.append((prefix, group_depth + 1, low))
+            pending.append((prefix | split_bit, group_depth + 1, high))
+        
+        self.global_depth = max(group_depth for _, group_depth, _ in leaves)
+        self.directory = array('l', bytes(self.directory.itemsize << self.global_depth))
+        self.pending = {}
+        self.depth_counts = [0] * (self.max_global_depth + 1)
+        self.num_overflow_pages = 0
+        
+        for prefix, group_depth, group in leaves:
+            head_id, pages_written = write_chain(self.store, group, capacity)
+            self._set_local_depth(head_id, group_depth)
+            self.io_cost += pages_written
+            self.num_overflow_pages += pages_written - 1
+            for d_key in range(prefix, len(self.directory), 1 << group_depth):
+                self.directory[d_key] = head_id
+        
+        return self.io_cost - io_start
+    
+    @instrumented('search')
+    def search(self, key):
+        if self.guard is not None and not self.guard.might_contain(key):
+            return False
+        page_id = self._page_at(self.get_dir_key(self.hash(key)))
+        for page in search_chain(self.store, page_id):
+            self.io_cost += 1
+            if key in page:
+                return True
+        return False
+    
+    @instrumented('delete')
+    def delete(self, key):
+        if self.guard is not None and not self.guard.might_contain(key):
+            return False
+        key_hash = self.hash(key)
+        if len(self.directory) < (1 << self.global_depth):
+            self._migrate_directory(self.doubling_step)
+        page_id = self._page_at(self.get_dir_key(key_hash))
+        
+        reads, writes, removed, freed = delete_from_chain(self.store, page_id, key)
+        self.io_cost += reads + writes
+        if not removed:
+            return False
+        
+        self.num_records -= 1
+        if self.guard is not None:
+            self.guard.discard(key)
+        if freed:
+            self.num_overflow_pages -= 1
+        if self.store.read(page_id).overflow_page is None:
+            self._merge(page_id, key_hash)
+        return True
+    
+    def update(self, old_key, new_key):
+        if not self.delete(old_key):
+            return False
+        self.insert(new_key)
+        return True
+    
+    def _guard_insert(self, key):
+        if not self.guard.needs_rebuild(self.num_records):
+            self.guard.add(key)
+            return
+        # o filtro ficou pequeno para a tabela: é refeito com todos os registros, lidos das páginas
+        records = [key]
+        for page_id in self._page_ids():
+            page_ids, chain_records = read_chain(self.store, page_id)
+            self.io_cost += len(page_ids)
+            records.extend(chain_records)
+        self.guard.rebuild(records)
+        self._emit('guard_rebuild', capacity=self.guard.capacity)
+    
+    def _allocate_page(self, local_depth):
+        page_id = self.store.allocate()
+        self._set_local_depth(page_id, local_depth)
+        return page_id
+    
+    def _set_local_depth(self, page_id, local_depth):
+        if page_id >= len(self.local_depths):
+            self.local_depths.frombytes(bytes(page_id + 1 - len(self.local_depths)))
+        self.local_depths[page_id] = local_depth
+        self.depth_counts[local_depth] += 1
+    
+    def _merge(self, page_id, key_hash):
+        """Junta a página com sua página irmã enquanto as duas couberem em uma só."""
+        while True:
+            local_depth = self.local_depths[page_id]
+            if local_depth == 1:
+                break
             
-            records_to_redistribute = page.records[:]
-            page.records = []
+            buddy_bit = 1 << (local_depth - 1)
+            slot = key_hash & ((1 << local_depth) - 1)
+            buddy_id = self._page_at(slot ^ buddy_bit)
+            if self.local_depths[buddy_id] != local_depth:
+                break
             
-            affected_entries = []
-            for d_key, d_entry in self.directory.items():
-                if d_entry['page_index'] == page_index:
-                    d_entry['local_depth'] = new_local_depth
-                    affected_entries.append(d_key)
+            page = self.store.read(page_id)
+            buddy = self.store.read(buddy_id)
+            self.io_cost += 1
+            if (buddy.overflow_page is not None
+                    or len(page) + len(buddy) > self.page_capacity):
+                break
+            
+            # fica a página do lado com o bit discriminante desligado, como no split
+            if slot & buddy_bit:
+                page_id, buddy_id = buddy_id, page_id
+                page, buddy = buddy, page
+            page.extend(buddy.records)
+            self.store.write(page_id, page)
+            self.io_cost += 1
             
-            discriminator_bit = 32 - new_local_depth
-            for d_key in affected_entries:
-                extended_key = d_key.zfill(32)
-                if extended_key[discriminator_bit] == '1':
-                    self.directory[d_key]['page_index'] = new_page_index
+            self.store.free(buddy_id)
+            self.depth_counts[local_depth] -= 2
+            self.depth_counts[local_depth - 1] += 1
+            self.local_depths[page_id] = local_depth - 1
             
-            for record in records_to_redistribute:
-                h = self.hash(record)
-                dk = self.get_dir_key(h)
-                p_idx = self.directory[dk]['page_index']
-                self.pages[p_idx].insert(record)
+            first_slot = (slot & (buddy_bit - 1)) | buddy_bit
+            self._set_slots(first_slot, 1 << local_depth, page_id)
+            self._emit('merge', page=page_id, freed_page=buddy_id, local_depth=local_depth - 1)
+        
+        while self.global_depth > 1 and self.depth_counts[self.global_depth] == 0:
+            self._halve_directory()
+    
+    def _insert_overflow(self, page_id, page, key):
+        while page.is_full():
+            if page.overflow_page is None:
+                page.overflow_page = self.store.allocate()
+                self.store.write(page_id, page)
+                self.num_overflow_pages += 1
+                self.io_cost += 1
+                self._emit('overflow_page', page=page_id, new_page=page.overflow_page)
+            self.io_cost += 1
+            page_id = page.overflow_page
+            page = self.store.read(page_id)
+        
+        page.insert(key)
+        self.store.write(page_id, page)
+        self.io_cost += 1
     
     def _double_directory(self):
         self.global_depth += 1
-        if self.global_depth > 20:
-            raise Exception("Profundidade global excessiva")
+        self.num_doublings += 1
         
-        new_directory = {}
-        for key, value in self.directory.items():
-            new_directory['0' + key] = value.copy()
-            new_directory['1' + key] = value.copy()
-        self.directory = new_directory
+        # a metade nova (bit mais alto = 1) aponta para as mesmas páginas da metade antiga;
+        # no modo incremental ela é copiada aos poucos pelas próximas operações
+        if self.doubling_step is None:
+            self.directory.extend(self.directory)
+        self._emit('doubling', global_depth=self.global_depth, directory_size=1 << self.global_depth)
+    
+    def _halve_directory(self):
+        # nenhuma página usa o bit mais alto, então as duas metades são iguais
+        self.global_depth -= 1
+        size = 1 << self.global_depth
+        del self.directory[size:]
+        if self.pending:
+            self.pending = {d_key: page_id for d_key, page_id in self.pending.items() if d_key < size}
+        self._emit('halving', global_depth=self.global_depth, directory_size=size)
     
     def get_space_usage(self):
-        return len(self.directory) + len(self.pages)
+        return (1 << self.global_depth) + self.store.num_pages
+    
+    def get_chain_lengths(self):
+        return chain_lengths(self.store, sorted(self._page_ids()))
+    
+    def memory_bytes(self):
+        """Bytes ocupados em memória pelas páginas (no store), pelo diretório e pelo guard."""
+        return (self.store.memory_bytes() + sys.getsizeof(self.directory) + sys.getsizeof(self.pending)
+                + sys.getsizeof(self.local_depths) + sys.getsizeof(self.depth_counts)
+                + (self.guard.memory_bytes() if self.guard is not None else 0))
+    
+    def save(self, path):
+        """Grava o diretório, o estado e todas as páginas em um snapshot binário (persistencia.py)."""
+        save_snapshot(self, path, ('directory', 'local_depths'))
+    
+    @classmethod
+    def load(cls, path, disk=False, buffer_pages=256, page_path=None):
+        """Restaura uma tabela gravada com save(); ver persistencia.load_snapshot."""
+        return load_snapshot(cls, path, disk=disk, buffer_pages=buffer_pages, page_path=page_path)
 
 class LinearHashing:
-    def __init__(self, page_capacity, alpha_max=0.75):
+    # estado escalar gravado no snapshot (persistencia.py), além da função hash, do guard
+    # e do vetor de buckets
+    SNAPSHOT_FIELDS = ('page_capacity', 'alpha_max', 'alpha_min', 'level', 'split_pointer', 'num_records',
+                       'num_initial_pages', 'num_overflow_pages', 'num_splits', 'io_cost', 'split_threshold',
+                       'contract_threshold')
+    
+    def __init__(self, page_capacity, alpha_max=0.75, alpha_min=None, store=None, hash_function=None,
+                 recorder=None, guard=None):
+        """
+        page_capacity: número de registros por página
+        alpha_max: fator de carga acima do qual uma página é dividida
+        alpha_min: fator de carga abaixo do qual a última página é juntada de volta
+            (padrão: alpha_max / 2)
+        store: onde as páginas são guardadas (padrão: MemoryPageStore, ver armazenamento.py)
+        hash_function: função hash (padrão: IdentityHash, a própria chave; ver funcoes_hash.py)
+        recorder: OperationRecorder opcional (instrumentacao.py) que recebe o tempo e as
+            páginas tocadas de cada operação e os eventos estruturais
+        guard: BloomGuard opcional (filtro_bloom.py) consultado antes de buscas e remoções;
+            as chaves que ele descarta retornam False sem percorrer a cadeia
+        """
+        self.hash_function = IdentityHash() if hash_function is None else hash_function
         self.page_capacity = page_capacity
         self.alpha_max = alpha_max
+        self.alpha_min = alpha_max / 2 if alpha_min is None else alpha_min
         self.level = 0
         self.split_pointer = 0
         self.num_records = 0
-        self.pages = [Page(page_capacity)]
+        self.store = MemoryPageStore(page_capacity) if store is None else store
+        # buckets[i]: identificador da página primária do bucket i no store
+        self.buckets = array('l', [self.store.allocate()])
         self.num_initial_pages = 1
+        self.num_overflow_pages = 0
+        self.num_splits = 0
         self.io_cost = 0
+        self.recorder = recorder
+        self.guard = guard
+        self._update_thresholds()
     
     def hash(self, key, level):
-        return key % (self.num_initial_pages * (2 ** level))
+        return self.hash_function(key) % (self.num_initial_pages * (2 ** level))
+    
+    def _emit(self, kind, **details):
+        if self.recorder is not None:
+            self.recorder.event(kind, self.num_records, **details)
     
     def get_page_index(self, key):
-        h = self.hash(key, self.level)
+        return self._bucket_of_hash(self.hash_function(key))
+    
+    def _bucket_of_hash(self, key_hash):
+        num_level_pages = self.num_initial_pages * (2 ** self.level)
+        h = key_hash % num_level_pages
         if h < self.split_pointer:
-            h = self.hash(key, self.level + 1)
+            h = key_hash % (2 * num_level_pages)
         return h
     
     def _find_page_and_insert(self, key):
-        page_index = self.get_page_index(key)
-        
-        while page_index >= len(self.pages):
-            self.pages.append(Page(self.page_capacity))
-        
-        page = self.pages[page_index]
+        page_id = self.buckets[self.get_page_index(key)]
+        page = self.store.read(page_id)
         self.io_cost += 1
         
-        current_page = page
-        while current_page.is_full():
-            if current_page.overflow_page is None:
-                current_page.overflow_page = Page(self.page_capacity)
+        while page.is_full():
+            if page.overflow_page is None:
+                page.overflow_page = self.store.allocate()
+                self.store.write(page_id, page)
+                self.num_overflow_pages += 1
                 self.io_cost += 1
+                self._emit('overflow_page', page=page_id, new_page=page.overflow_page)
             self.io_cost += 1
-            current_page = current_page.overflow_page
+            page_id = page.overflow_page
+            page = self.store.read(page_id)
         
-        current_page.insert(key)
+        page.insert(key)
+        self.store.write(page_id, page)
         self.io_cost += 1
     
+    @instrumented('insert')
     def insert(self, key):
         self._find_page_and_insert(key)
         self.num_records += 1
+        if self.guard is not None:
+            self._guard_insert(key)
         
-        if self.get_load_factor() > self.alpha_max:
+        if self.num_records > self.split_threshold:
             self._split()
     
-    def _split(self):
-        self.pages.append(Page(self.page_capacity))
-        self.io_cost += 1
+    def insert_many(self, keys):
+        """
+        Carga em lote: o número de páginas (e com ele level e split_pointer) é
+        definido de uma vez pelo total de registros e alpha_max; os registros são
+        particionados em um passe e cada cadeia é escrita uma única vez, em ordem.
+        Retorna o io_cost gasto pela carga.
+        """
+        io_start = self.io_cost
         
-        page_to_split = self.pages[self.split_pointer]
-        self.io_cost += 1
+        # cada página viva é lida uma vez para recuperar os registros existentes
+        self.io_cost += len(self.buckets) + self.num_overflow_pages
+        records = []
+        for page_id in self.buckets:
+            records.extend(drain_chain(self.store, page_id))
+        records.extend(keys)
+        self.num_records = len(records)
+        if self.guard is not None:
+            self.guard.rebuild(records)
         
-        all_records = []
-        current_page = page_to_split
-        while current_page:
-            all_records.extend(current_page.records)
-            current_page = current_page.overflow_page
+        num_pages = math.ceil(self.num_records / (self.page_capacity * self.alpha_max))
+        num_pages = max(self.num_initial_pages, num_pages)
         
-        page_to_split.records = []
-        page_to_split.overflow_page = None
-        self.io_cost += 1
+        self.level = 0
+        while self.num_initial_pages * (2 ** (self.level + 1)) <= num_pages:
+            self.level += 1
+        self.split_pointer = num_pages - self.num_initial_pages * (2 ** self.level)
         
-        self.split_pointer += 1
+        groups = [[] for _ in range(num_pages)]
+        hashes = self.hash_function.hash_many(np.array(records, dtype=np.uint64))
+        for key, key_hash in zip(records, hashes.tolist()):
+            groups[self._bucket_of_hash(key_hash)].append(key)
+        
+        self.buckets = array('l')
+        self.num_overflow_pages = 0
+        for group in groups:
+            head_id, pages_written = write_chain(self.store, group, self.page_capacity)
+            self.buckets.append(head_id)
+            self.num_overflow_pages += pages_written - 1
+            self.io_cost += pages_written
         
+        self._update_thresholds()
+        return self.io_cost - io_start
+    
+    def _guard_insert(self, key):
+        if not self.guard.needs_rebuild(self.num_records):
+            self.guard.add(key)
+            return
+        # o filtro ficou pequeno para a tabela: é refeito com todos os registros, lidos das cadeias
+        records = []
+        for page_id in self.buckets:
+            page_ids, chain_records = read_chain(self.store, page_id)
+            self.io_cost += len(page_ids)
+            records.extend(chain_records)
+        self.guard.rebuild(records)
+        self._emit('guard_rebuild', capacity=self.guard.capacity)
+    
+    def _split(self):
+        self.num_splits += 1
+        bucket = self.split_pointer
+        new_page_id = self.store.allocate()
+        self.buckets.append(new_page_id)
+        
+        page_ids, all_records = read_chain(self.store, self.buckets[bucket])
+        self.io_cost += len(page_ids)
+        
+        # a cadeia antiga é particionada direto entre os dois buckets pelo hash do nível seguinte
+        kept_records = []
+        moved_records = []
         for record in all_records:
-            self._find_page_and_insert(record)
+            if self.hash(record, self.level + 1) == bucket:
+                kept_records.append(record)
+            else:
+                moved_records.append(record)
+        
+        self._rewrite_chains(page_ids, [(page_ids[0], kept_records), (new_page_id, moved_records)])
+        self._emit('split', bucket=bucket, chain_pages=len(page_ids), moved=len(moved_records))
         
+        self.split_pointer += 1
         if self.split_pointer == self.num_initial_pages * (2 ** self.level):
             self.level += 1
             self.split_pointer = 0
+            self._emit('level', level=self.level, num_buckets=len(self.buckets))
+        self._update_thresholds()
+    
+    def _rewrite_chains(self, old_page_ids, chains):
+        """
+        Reescreve cada (página inicial, registros) de chains como uma cadeia compacta,
+        reaproveitando as páginas de overflow de old_page_ids; as que sobram são liberadas.
+        """
+        head_ids = {head_id for head_id, _ in chains}
+        spare_ids = [page_id for page_id in old_page_ids if page_id not in head_ids]
+        self.num_overflow_pages -= len(spare_ids)
+        for head_id, records in chains:
+            _, pages_written = write_chain(self.store, records, self.page_capacity,
+                                          head_id=head_id, spare_ids=spare_ids)
+            self.num_overflow_pages += pages_written - 1
+            self.io_cost += pages_written
+        for page_id in spare_ids:
+            self.store.free(page_id)
+    
+    @instrumented('search')
+    def search(self, key):
+        if self.guard is not None and not self.guard.might_contain(key):
+            return False
+        page_id = self.buckets[self.get_page_index(key)]
+        for page in search_chain(self.store, page_id):
+            self.io_cost += 1
+            if key in page:
+                return True
+        return False
+    
+    @instrumented('delete')
+    def delete(self, key):
+        if self.guard is not None and not self.guard.might_contain(key):
+            return False
+        page_id = self.buckets[self.get_page_index(key)]
+        
+        reads, writes, removed, freed = delete_from_chain(self.store, page_id, key)
+        self.io_cost += reads + writes
+        if not removed:
+            return False
+        
+        if freed:
+            self.num_overflow_pages -= 1
+        self.num_records -= 1
+        if self.guard is not None:
+            self.guard.discard(key)
+        
+        if self.num_records < self.contract_threshold:
+            self._contract()
+        return True
+    
+    def update(self, old_key, new_key):
+        if not self.delete(old_key):
+            return False
+        self.insert(new_key)
+        return True
+    
+    def _contract(self):
+        """Desfaz o último split: a última cadeia é juntada à cadeia da sua página de origem."""
+        if len(self.buckets) <= self.num_initial_pages:
+            return
+        
+        if self.split_pointer == 0:
+            self.level -= 1
+            self.split_pointer = self.num_initial_pages * (2 ** self.level)
+            self._emit('level', level=self.level, num_buckets=len(self.buckets) - 1)
+        self.split_pointer -= 1
+        
+        target_id = self.buckets[self.split_pointer]
+        target_ids, target_records = read_chain(self.store, target_id)
+        last_ids, last_records = read_chain(self.store, self.buckets.pop())
+        self.io_cost += len(target_ids) + len(last_ids)
+        
+        # a página primária do último bucket passa a ser contada como overflow até ser reaproveitada
+        self.num_overflow_pages += 1
+        self._rewrite_chains(target_ids + last_ids, [(target_id, target_records + last_records)])
+        self._emit('contraction', bucket=self.split_pointer, chain_pages=len(target_ids) + len(last_ids))
+        self._update_thresholds()
+    
+    def _update_thresholds(self):
+        # número de registros que dispara um split/uma contração com o número atual de páginas
+        num_slots = len(self.buckets) * self.page_capacity
+        self.split_threshold = self.alpha_max * num_slots
+        self.contract_threshold = self.alpha_min * num_slots
     
     def get_load_factor(self):
-        num_slots = len(self.pages) * self.page_capacity
+        num_slots = len(self.buckets) * self.page_capacity
         return self.num_records / num_slots if num_slots > 0 else 0
     
     def get_space_usage(self):
-        space = len(self.pages)
-        for page in self.pages:
-            current = page.overflow_page
-            while current:
-                space += 1
-                current = current.overflow_page
-        return space
+        return len(self.buckets) + self.num_overflow_pages
+    
+    def get_chain_lengths(self):
+        return chain_lengths(self.store, self.buckets)
+    
+    def memory_bytes(self):
+        """Bytes ocupados em memória pelas páginas (no store), pela tabela de buckets e pelo guard."""
+        return (self.store.memory_bytes() + sys.getsizeof(self.buckets)
+                + (self.guard.memory_bytes() if self.guard is not None else 0))
+    
+    def save(self, path):
+        """Grava os buckets, level, split_pointer e todas as páginas em um snapshot binário (persistencia.py)."""
+        save_snapshot(self, path, ('buckets',))
+    
+    @classmethod
+    def load(cls, path, disk=False, buffer_pages=256, page_path=None):
+        """Restaura uma tabela gravada com save(); ver persistencia.load_snapshot."""
+        return load_snapshot(cls, path, disk=disk, buffer_pages=buffer_pages, page_path=page_path)
 
-def generate_random_keys(count):
-    return random.sample(range(count * 10), count)
+def generate_random_keys(count, seed=None):
+    """count chaves distintas de [0, 10 * count); ver experimentos.stream_random_keys."""
+    if seed is None:
+        seed = random.getrandbits(64)
+    return [key for chunk in stream_random_keys(count, count * 10, seed) for key in chunk]
 
-def run_experiment():
-    print("=== Estudo Comparativo: Hash Extensível vs Hash Linear ===\n")
+def measure_search_cost(table, present_keys, missing_keys):
+    """Custo médio de I/O de buscas bem e malsucedidas, sem alterar o io_cost da tabela."""
+    io_start = table.io_cost
+    for key in present_keys:
+        table.search(key)
+    hit_cost = (table.io_cost - io_start) / len(present_keys)
+    
+    io_before = table.io_cost
+    for key in missing_keys:
+        table.search(key)
+    miss_cost = (table.io_cost - io_before) / len(missing_keys)
+    
+    table.io_cost = io_start
+    return hit_cost, miss_cost
+
+def new_series():
+    return {
+        'space': [], 'effort': [], 'memory_bytes': [], 'search_hit': [], 'search_miss': [],
+        'bulk_space': [], 'bulk_effort': []
+    }
+
+def grow_with_checkpoints(table, keys, missing_keys, checkpoints, n_values, series, curves, structure):
+    """
+    Insere as chaves em uma única tabela crescente e, cada vez que o número de inserções
+    atinge um checkpoint, anexa espaço, esforço e memória como uma linha de curves
+    (ColumnStore), com o índice structure da configuração. Nos valores de n_values também
+    registra esses valores no resumo da série e mede o custo de busca.
+    """
+    inserted = 0
+    for checkpoint in checkpoints:
+        for i in range(inserted, checkpoint):
+            table.insert(keys[i])
+        inserted = checkpoint
+        
+        space = table.get_space_usage()
+        memory = table.memory_bytes()
+        curves.append(structure=structure, checkpoint=checkpoint, space=space, effort=table.io_cost,
+                      memory_bytes=memory)
+        
+        if checkpoint in n_values:
+            series['space'].append(space)
+            series['effort'].append(table.io_cost)
+            series['memory_bytes'].append(memory)
+            print(f"{checkpoint}\t{space}\t{table.io_cost}")
+            hit_cost, miss_cost = measure_search_cost(table, keys[:checkpoint], missing_keys[:checkpoint])
+            series['search_hit'].append(hit_cost)
+            series['search_miss'].append(miss_cost)
+
+def run_experiment(dump_events=False):
+    """dump_events: grava o trace completo dos eventos em questao_2_instrumentacao.json"""
+    print("=== Estudo Comparativo: Hash Extensível vs Hash Linear vs Árvore B+ ===\n")
     
     page_capacity = 10
     n_values = [1000, 2000, 5000, 10000, 20000]
     alpha_max_values = [0.6, 0.75, 0.9]
+    # árvores B+ com o mesmo valor numérico nas duas convenções de questao_1: d = 5 tem a
+    # capacidade das páginas das tabelas (2d = 10 chaves) e t = 5 uma a menos (2t - 1 = 9)
+    tree_configurations = [('d', page_capacity // 2), ('t', page_capacity // 2)]
+    tree_labels = [f"{convention}={order}" for convention, order in tree_configurations]
+    # larguras dos intervalos consultados, em número médio de chaves inseridas que caem neles
+    range_sizes = [10, 100, 1000]
+    num_range_queries = 200
     
     max_n = max(n_values)
-    keys = generate_random_keys(max_n)
+    # uma tabela por configuração cresce até max_n; os checkpoints (a cada 1% de max_n,
+    # mais os valores de n_values) guardam a curva completa de espaço/esforço
+    checkpoint_step = max(1, max_n // 100)
+    checkpoints = sorted(set(range(checkpoint_step, max_n + 1, checkpoint_step)) | set(n_values))
+    # a segunda metade das chaves nunca é inserida e serve para as buscas malsucedidas
+    all_keys = generate_random_keys(2 * max_n)
+    keys = all_keys[:max_n]
+    missing_keys = all_keys[max_n:]
     
     results = {
-        'extensible': {'space': [], 'effort': []},
-        'linear': {}
+        'page_capacity': page_capacity,
+        'n_values': n_values,
+        'checkpoints': checkpoints,
+        'curves_store': CURVES_STORE,
+        'extensible': new_series(),
+        'linear': {},
+        'bplus': {label: new_series() for label in tree_labels}
     }
     
     for alpha in alpha_max_values:
-        results['linear'][alpha] = {'space': [], 'effort': []}
+        results['linear'][alpha] = new_series()
     
     print("Executando Hash Extensível...")
     print("n\tEspaço\tEsforço(I/O)")
     print("-" * 30)
     
+    # curvas densas em colunas anexáveis (colunar.py): uma linha por configuração e checkpoint,
+    # na ordem de structures, então a curva da configuração i é a linha i de cada coluna
+    # redimensionada para len(structures) × len(checkpoints)
+    curves = ColumnStore(CURVES_STORE, {
+        'structure': np.int16, 'checkpoint': np.int64, 'space': np.int64, 'effort': np.int64,
+        'memory_bytes': np.int64
+    }, metadata={
+        'structures': ['extensible'] + ['linear'] * len(alpha_max_values) + ['bplus'] * len(tree_configurations),
+        'alpha_max': [None] + alpha_max_values + [None] * len(tree_configurations),
+        'convention': [None] * (1 + len(alpha_max_values)) + [convention for convention, _ in tree_configurations],
+        'order': [None] * (1 + len(alpha_max_values)) + [order for _, order in tree_configurations],
+        'checkpoints': checkpoints
+    })
+    
+    # latência por operação e trace de eventos estruturais, exportados à parte
+    recorders = {'extensible': OperationRecorder(), 'linear': {}, 'bplus': {}}
+    # as tabelas completas ficam guardadas para a comparação das consultas por intervalo
+    full_tables = {'Ext.': ExtensibleHashing(page_capacity, recorder=recorders['extensible'])}
+    grow_with_checkpoints(full_tables['Ext.'], keys, missing_keys, checkpoints, n_values, results['extensible'],
+                          curves, 0)
+    
     for n in n_values:
-        eh = ExtensibleHashing(page_capacity)
-        for i in range(n):
-            eh.insert(keys[i])
-        results['extensible']['space'].append(eh.get_space_usage())
-        results['extensible']['effort'].append(eh.io_cost)
-        print(f"{n}\t{eh.get_space_usage()}\t{eh.io_cost}")
+        eh_bulk = ExtensibleHashing(page_capacity)
+        results['extensible']['bulk_effort'].append(eh_bulk.insert_many(keys[:n]))
+        results['extensible']['bulk_space'].append(eh_bulk.get_space_usage())
     
-    for alpha in alpha_max_values:
+    for structure, alpha in enumerate(alpha_max_values, start=1):
         print(f"\nExecutando Hash Linear (alpha_max={alpha})...")
         print("n\tEspaço\tEsforço(I/O)")
         print("-" * 30)
         
+        recorders['linear'][alpha] = OperationRecorder()
+        table = LinearHashing(page_capacity, alpha_max=alpha, recorder=recorders['linear'][alpha])
+        full_tables[f"Lin({alpha})"] = table
+        grow_with_checkpoints(table, keys, missing_keys, checkpoints, n_values, results['linear'][alpha], curves,
+                              structure)
+        
+        for n in n_values:
+            lh_bulk = LinearHashing(page_capacity, alpha_max=alpha)
+            results['linear'][alpha]['bulk_effort'].append(lh_bulk.insert_many(keys[:n]))
+            results['linear'][alpha]['bulk_space'].append(lh_bulk.get_space_usage())
+    
+    for structure, ((convention, order), label) in enumerate(zip(tree_configurations, tree_labels),
+                                                              start=1 + len(alpha_max_values)):
+        print(f"\nExecutando Árvore B+ ({label})...")
+        print("n\tEspaço\tEsforço(I/O)")
+        print("-" * 30)
+        
+        recorders['bplus'][label] = OperationRecorder()
+        tree = BPlusTree(order, convention, recorder=recorders['bplus'][label])
+        full_tables[f"B+({label})"] = tree
+        grow_with_checkpoints(tree, keys, missing_keys, checkpoints, n_values, results['bplus'][label], curves,
+                              structure)
+        
         for n in n_values:
-            lh = LinearHashing(page_capacity, alpha_max=alpha)
-            for i in range(n):
-                lh.insert(keys[i])
-            results['linear'][alpha]['space'].append(lh.get_space_usage())
-            results['linear'][alpha]['effort'].append(lh.io_cost)
-            print(f"{n}\t{lh.get_space_usage()}\t{lh.io_cost}")
+            tree_bulk = BPlusTree(order, convention)
+            results['bplus'][label]['bulk_effort'].append(tree_bulk.insert_many(keys[:n]))
+            results['bplus'][label]['bulk_space'].append(tree_bulk.get_space_usage())
+    
+    # consultas por intervalo sobre as estruturas completas: a árvore desce até a folha do
+    # início e segue o encadeamento; uma tabela hash não preserva a ordem das chaves e
+    # precisa ler todas as suas páginas (cadeias de overflow incluídas)
+    key_space = 20 * max_n
+    range_starts = random.Random(max_n).sample(range(key_space), num_range_queries)
+    results['range_scan'] = {'range_sizes': range_sizes, 'num_queries': num_range_queries, 'io': {}}
+    for label, table in full_tables.items():
+        if isinstance(table, BPlusTree):
+            costs = []
+            for range_size in range_sizes:
+                width = range_size * key_space // max_n
+                io_start = table.io_cost
+                for low in range_starts:
+                    table.range_search(low, low + width - 1)
+                costs.append((table.io_cost - io_start) / num_range_queries)
+                table.io_cost = io_start
+        else:
+            costs = [table.store.num_pages] * len(range_sizes)
+        results['range_scan']['io'][label] = costs
     
     print("\n=== ANÁLISE COMPARATIVA ===\n")
     
+    all_series = ([results['extensible']] + [results['linear'][a] for a in alpha_max_values]
+                  + [results['bplus'][label] for label in tree_labels])
+    
     print("1. ESPAÇO REQUERIDO:")
-    print("n\tExt.\tLin(0.6)\tLin(0.75)\tLin(0.9)")
-    print("-" * 50)
+    print("n\tExt.\tLin(0.6)\tLin(0.75)\tLin(0.9)\tB+(d=5)\tB+(t=5)")
+    print("-" * 70)
     for i in range(len(n_values)):
-        row = [
-            n_values[i],
-            results['extensible']['space'][i],
-            results['linear'][0.6]['space'][i],
-            results['linear'][0.75]['space'][i],
-            results['linear'][0.9]['space'][i]
-        ]
+        row = [n_values[i]] + [values['space'][i] for values in all_series]
         print('\t'.join(map(str, row)))
     
     print("\n2. ESFORÇO DE INCLUSÃO (I/O):")
-    print("n\tExt.\tLin(0.6)\tLin(0.75)\tLin(0.9)")
-    print("-" * 50)
+    print("n\tExt.\tLin(0.6)\tLin(0.75)\tLin(0.9)\tB+(d=5)\tB+(t=5)")
+    print("-" * 70)
     for i in range(len(n_values)):
-        row = [
-            n_values[i],
-            results['extensible']['effort'][i],
-            results['linear'][0.6]['effort'][i],
-            results['linear'][0.75]['effort'][i],
-            results['linear'][0.9]['effort'][i]
-        ]
+        row = [n_values[i]] + [values['effort'][i] for values in all_series]
         print('\t'.join(map(str, row)))
     
+    print("\n3. CUSTO MÉDIO DE BUSCA (páginas lidas por busca, sucesso/fracasso):")
+    print("n\tExt.\t\tLin(0.6)\tLin(0.75)\tLin(0.9)\tB+(d=5)\t\tB+(t=5)")
+    print("-" * 100)
+    for i in range(len(n_values)):
+        row = [str(n_values[i])]
+        for values in all_series:
+            row.append(f"{values['search_hit'][i]:.2f}/{values['search_miss'][i]:.2f}")
+        print('\t'.join(row))
+    
+    print("\n4. CARGA EM LOTE (insert_many), esforço de I/O e espaço:")
+    print("n\tExt.\t\tLin(0.6)\tLin(0.75)\tLin(0.9)\tB+(d=5)\t\tB+(t=5)")
+    print("-" * 100)
+    for i in range(len(n_values)):
+        row = [str(n_values[i])]
+        for values in all_series:
+            row.append(f"{values['bulk_effort'][i]}/{values['bulk_space'][i]}")
+        print('\t'.join(row))
+    
+    print("\n5. MEMÓRIA OCUPADA (KiB):")
+    print("n\tExt.\tLin(0.6)\tLin(0.75)\tLin(0.9)\tB+(d=5)\tB+(t=5)")
+    print("-" * 70)
+    for i in range(len(n_values)):
+        row = [str(n_values[i])]
+        for values in all_series:
+            row.append(f"{values['memory_bytes'][i] / 1024:.1f}")
+        print('\t'.join(row))
+    
+    print("\n6. LATÊNCIA POR INSERÇÃO (p50 / p99 / máx.):")
+    print("Estrutura\tTempo (µs)\t\t\tPáginas tocadas\t\tEventos")
+    print("-" * 90)
+    labeled_recorders = [('Ext.', recorders['extensible'])]
+    labeled_recorders += [(f"Lin({a})", recorders['linear'][a]) for a in alpha_max_values]
+    labeled_recorders += [(f"B+({label})", recorders['bplus'][label]) for label in tree_labels]
+    for label, recorder in labeled_recorders:
+        insert_stats = recorder.summary()['insert']
+        times = insert_stats['time_us']
+        pages = insert_stats['pages']
+        events = ', '.join(f"{kind}={count}" for kind, count in recorder.event_counts().items())
+        print(f"{label}\t\t{times['p50']:.1f} / {times['p99']:.1f} / {times['max']:.1f}\t\t"
+              f"{pages['p50']} / {pages['p99']} / {pages['max']}\t\t{events}")
+    
+    print(f"\n7. CONSULTA POR INTERVALO (páginas lidas por consulta, n={max_n}):")
+    print("Chaves no intervalo\t" + "\t".join(full_tables))
+    print("-" * 100)
+    for i, range_size in enumerate(range_sizes):
+        costs = [results['range_scan']['io'][label][i] for label in full_tables]
+        print(f"{range_size}\t\t\t" + "\t".join(f"{cost:.1f}" for cost in costs))
+    
     print("\n=== ANÁLISE DE TENDÊNCIAS ===\n")
     
     print("Taxa de crescimento do espaço (relativo a n=1000):")
@@ -279,9 +1046,465 @@ def run_experiment():
         ratio7590 = space75 / space90
         print(f"n={n_values[i]}: α(0.6)/α(0.75)={ratio6075:.2f}, α(0.75)/α(0.9)={ratio7590:.2f}")
     
+    curves.flush()
     with open('questao_2_resultados.json', 'w') as f:
         json.dump(results, f, indent=2)
-    print("\nResultados exportados para 'questao_2_resultados.json'")
+    print(f"\nResultados exportados para 'questao_2_resultados.json' e '{CURVES_STORE}/'")
+    
+    instrumentation = {
+        'page_capacity': page_capacity,
+        'n': max_n,
+        'extensible': recorders['extensible'].to_dict(dump_events),
+        'linear': {alpha: recorder.to_dict(dump_events) for alpha, recorder in recorders['linear'].items()},
+        'bplus': {label: recorder.to_dict(dump_events) for label, recorder in recorders['bplus'].items()}
+    }
+    with open('questao_2_instrumentacao.json', 'w') as f:
+        json.dump(instrumentation, f, indent=2)
+    exported = "Latências e eventos" if dump_events else "Latências e contagem de eventos"
+    print(f"{exported} exportados para 'questao_2_instrumentacao.json'")
+
+def run_disk_experiment():
+    print("=== Hash em disco: páginas em arquivo mapeado + buffer pool LRU ===\n")
+    
+    page_capacity = 10
+    buffer_pages = 1024
+    n_values = [10000, 100000, 1000000]
+    # as chaves são geradas em blocos a cada execução, sem guardar a lista inteira
+    seed = random.getrandbits(64)
+    
+    tables = {
+        'extensible': lambda store: ExtensibleHashing(page_capacity, store=store),
+        'linear': lambda store: LinearHashing(page_capacity, alpha_max=0.75, store=store)
+    }
+    stores = {
+        'memory': lambda: MemoryPageStore(page_capacity),
+        'disk': lambda: DiskPageStore(page_capacity, buffer_pages=buffer_pages)
+    }
+    
+    results = {'page_capacity': page_capacity, 'buffer_pages': buffer_pages, 'runs': []}
+    
+    print("Estrutura\tStore\tn\tTempo(s)\tI/O contado\tLeituras\tEscritas\tAcertos")
+    print("-" * 90)
+    for table_name, make_table in tables.items():
+        for store_name, make_store in stores.items():
+            for n in n_values:
+                store = make_store()
+                table = make_table(store)
+                
+                start = time.perf_counter()
+                for chunk in stream_random_keys(n, max(n_values) * 10, seed):
+                    for key in chunk:
+                        table.insert(key)
+                store.flush()
+                elapsed = time.perf_counter() - start
+                
+                stats = store.get_stats()
+                store.close()
+                
+                results['runs'].append({
+                    'structure': table_name,
+                    'store': store_name,
+                    'n': n,
+                    'time': elapsed,
+                    'io_cost': table.io_cost,
+                    'space': table.get_space_usage(),
+                    **stats
+                })
+                hit_rate = f"{stats['hit_rate']:.3f}" if 'hit_rate' in stats else '-'
+                print(f"{table_name}\t{store_name}\t{n}\t{elapsed:.2f}\t\t{table.io_cost}\t\t"
+                      f"{stats['reads']}\t\t{stats['writes']}\t\t{hit_rate}")
+    
+    with open('questao_2_disco_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados exportados para 'questao_2_disco_resultados.json'")
+
+def extensible_grid_task(n, page_capacity, seed):
+    """Uma célula da grade do hash extensível, que não depende de alpha_max."""
+    eh = ExtensibleHashing(page_capacity)
+    for chunk in stream_random_keys(n, n * 10, seed):
+        for key in chunk:
+            eh.insert(key)
+    
+    return {
+        'extensible_space': eh.get_space_usage(),
+        'extensible_effort': eh.io_cost
+    }
+
+def linear_grid_task(n, alpha_max, page_capacity, seed):
+    """Uma célula da grade do hash linear: constrói a tabela com n chaves geradas a partir de seed."""
+    lh = LinearHashing(page_capacity, alpha_max=alpha_max)
+    for chunk in stream_random_keys(n, n * 10, seed):
+        for key in chunk:
+            lh.insert(key)
+    
+    return {
+        'linear_space': lh.get_space_usage(),
+        'linear_effort': lh.io_cost
+    }
+
+def run_grid_experiment():
+    print("=== Grade de experimentos: n × alpha_max × capacidade da página × semente ===\n")
+    
+    grid = {
+        'n': [1000, 5000, 20000],
+        'alpha_max': [0.6, 0.75, 0.9],
+        'page_capacity': [5, 10, 20, 50]
+    }
+    extensible_grid = {name: values for name, values in grid.items() if name != 'alpha_max'}
+    num_seeds = 10
+    # as sementes só dependem de n e da capacidade: em cada repetição, o hash extensível
+    # e o linear com cada alpha_max recebem as mesmas chaves
+    seed_params = ('n', 'page_capacity')
+    
+    start = time.perf_counter()
+    extensible_runs = run_grid(extensible_grid_task, extensible_grid, num_seeds, seed_params=seed_params)
+    runs = run_grid(linear_grid_task, grid, num_seeds, seed_params=seed_params)
+    extensible_summary = summarize(extensible_runs)
+    summary = summarize(runs)
+    elapsed = time.perf_counter() - start
+    extensible_metrics = {(entry['params']['n'], entry['params']['page_capacity']): entry['metrics']
+                          for entry in extensible_summary}
+    
+    print("n\tα_max\tCap.\tEspaço Ext. (IC 95%)\t\tEspaço Lin. (IC 95%)\t\tI/O Lin. (IC 95%)")
+    print("-" * 110)
+    for entry in summary:
+        params = entry['params']
+        metrics = {**extensible_metrics[params['n'], params['page_capacity']], **entry['metrics']}
+        cells = [
+            f"{metrics[name]['mean']:.1f} [{metrics[name]['ci_low']:.1f}, {metrics[name]['ci_high']:.1f}]"
+            for name in ('extensible_space', 'linear_space', 'linear_effort')
+        ]
+        print(f"{params['n']}\t{params['alpha_max']}\t{params['page_capacity']}\t" + '\t\t'.join(cells))
+    
+    print(f"\n{len(extensible_runs) + len(runs)} execuções em {elapsed:.1f}s usando {os.cpu_count()} processos")
+    
+    with open('questao_2_grade_resultados.json', 'w') as f:
+        json.dump({
+            'grid': grid,
+            'num_seeds': num_seeds,
+            'runs': runs,
+            'summary': summary,
+            'extensible_grid': extensible_grid,
+            'extensible_runs': extensible_runs,
+            'extensible_summary': extensible_summary
+        }, f, indent=2)
+    print("Resultados exportados para 'questao_2_grade_resultados.json'")
+
+def run_doubling_experiment():
+    print("=== Duplicação do diretório: síncrona vs incremental ===\n")
+    
+    page_capacity = 10
+    n = 500000
+    doubling_steps = [None, 1024, 64, 8]
+    seed = random.getrandbits(64)
+    
+    results = {'page_capacity': page_capacity, 'n': n, 'runs': []}
+    
+    print("Passo\t\tTempo total(s)\tInserção p50 / p99 / máx. (µs)\tCópias máx./inserção\tDiretório")
+    print("-" * 90)
+    for doubling_step in doubling_steps:
+        recorder = OperationRecorder(trace_events=False)
+        table = ExtensibleHashing(page_capacity, recorder=recorder, doubling_step=doubling_step)
+        # entradas do diretório copiadas por uma única inserção (a duplicação síncrona copia tudo)
+        max_copied = 0
+        # o coletor de lixo é desligado para que as suas pausas não se confundam com as da tabela
+        gc.disable()
+        start = time.perf_counter()
+        for chunk in stream_random_keys(n, n * 10, seed):
+            for key in chunk:
+                directory_size = len(table.directory)
+                table.insert(key)
+                max_copied = max(max_copied, len(table.directory) - directory_size)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        
+        insert_stats = recorder.summary()['insert']
+        times = insert_stats['time_us']
+        results['runs'].append({
+            'doubling_step': doubling_step,
+            'time': elapsed,
+            'global_depth': table.global_depth,
+            'copied_slots': len(table.directory),
+            'pending_slots': len(table.pending),
+            'max_copied_per_insert': max_copied,
+            'io_cost': table.io_cost,
+            'insert': insert_stats
+        })
+        label = 'síncrona' if doubling_step is None else str(doubling_step)
+        print(f"{label:<10}\t{elapsed:.2f}\t\t{times['p50']:.1f} / {times['p99']:.1f} / {times['max']:.1f}\t\t"
+              f"{max_copied}\t\t\t{len(table.directory)}/{1 << table.global_depth}")
+    
+    with open('questao_2_duplicacao_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados exportados para 'questao_2_duplicacao_resultados.json'")
+
+def run_sharded_experiment():
+    print("=== Tabela particionada: vazão de 1 a N shards ===\n")
+    
+    page_capacity = 10
+    n = 400000
+    batch_size = 50000
+    max_shards = max(4, os.cpu_count() or 1)
+    shard_counts = [2 ** i for i in range(max_shards.bit_length()) if 2 ** i <= max_shards]
+    seed = random.getrandbits(64)
+    keys = np.array(generate_random_keys(2 * n, seed), dtype=np.uint64)
+    present_keys, missing_keys = keys[:n], keys[n:]
+    
+    tables = {
+        'extensible': (ExtensibleHashing, {'page_capacity': page_capacity}),
+        'linear': (LinearHashing, {'page_capacity': page_capacity, 'alpha_max': 0.75})
+    }
+    
+    results = {'page_capacity': page_capacity, 'n': n, 'batch_size': batch_size,
+               'cpu_count': os.cpu_count(), 'runs': []}
+    
+    print("Estrutura\tShards\tInserções/s\tBuscas/s\tSpeedup\tEspaço\tEsforço(I/O)")
+    print("-" * 80)
+    for table_name, (table_class, options) in tables.items():
+        base_rate = None
+        for num_shards in shard_counts:
+            with ShardedHashTable(table_class, num_shards, **options) as table:
+                start = time.perf_counter()
+                for batch_start in range(0, n, batch_size):
+                    table.insert_many(present_keys[batch_start:batch_start + batch_size])
+                insert_time = time.perf_counter() - start
+                
+                start = time.perf_counter()
+                for batch_start in range(0, n, batch_size):
+                    found = table.search_many(present_keys[batch_start:batch_start + batch_size])
+                    missing = table.search_many(missing_keys[batch_start:batch_start + batch_size])
+                    assert found.all() and not missing.any()
+                search_time = time.perf_counter() - start
+                
+                stats = table.get_stats()
+            
+            insert_rate = n / insert_time
+            search_rate = 2 * n / search_time
+            base_rate = base_rate or insert_rate
+            results['runs'].append({
+                'structure': table_name,
+                'num_shards': num_shards,
+                'insert_time': insert_time,
+                'search_time': search_time,
+                'inserts_per_second': insert_rate,
+                'searches_per_second': search_rate,
+                'speedup': insert_rate / base_rate,
+                **stats
+            })
+            print(f"{table_name}\t{num_shards}\t{insert_rate:.0f}\t\t{search_rate:.0f}\t\t"
+                  f"{insert_rate / base_rate:.2f}x\t{stats['space']}\t{stats['io_cost']}")
+    
+    print(f"\n{os.cpu_count()} CPUs disponíveis")
+    
+    with open('questao_2_particionado_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("Resultados exportados para 'questao_2_particionado_resultados.json'")
+
+def run_snapshot_experiment():
+    print("=== Snapshots: reconstrução vs save/load ===\n")
+    
+    page_capacity = 10
+    n = 1000000
+    seed = random.getrandbits(64)
+    
+    tables = {
+        'extensible': lambda: ExtensibleHashing(page_capacity),
+        'linear': lambda: LinearHashing(page_capacity, alpha_max=0.75)
+    }
+    
+    results = {'page_capacity': page_capacity, 'n': n, 'runs': []}
+    
+    print("Estrutura\tReconstrução(s)\tsave(s)\tload memória(s)\tload disco(s)\tArquivo(MiB)")
+    print("-" * 90)
+    for table_name, make_table in tables.items():
+        start = time.perf_counter()
+        table = make_table()
+        for chunk in stream_random_keys(n, n * 10, seed):
+            for key in chunk:
+                table.insert(key)
+        rebuild_time = time.perf_counter() - start
+        
+        fd, path = tempfile.mkstemp(suffix='.snapshot')
+        os.close(fd)
+        start = time.perf_counter()
+        table.save(path)
+        save_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        memory_table = type(table).load(path)
+        load_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        disk_table = type(table).load(path, disk=True)
+        disk_load_time = time.perf_counter() - start
+        
+        # confere as duas cópias com uma amostra das chaves
+        sample = next(stream_random_keys(1000, n * 10, seed))
+        assert all(memory_table.search(key) and disk_table.search(key) for key in sample)
+        disk_table.store.close()
+        file_size = os.path.getsize(path)
+        os.remove(path)
+        
+        results['runs'].append({
+            'structure': table_name,
+            'rebuild_time': rebuild_time,
+            'save_time': save_time,
+            'load_time': load_time,
+            'disk_load_time': disk_load_time,
+            'file_bytes': file_size
+        })
+        print(f"{table_name}\t{rebuild_time:.2f}\t\t{save_time:.2f}\t{load_time:.2f}\t\t"
+              f"{disk_load_time:.2f}\t\t{file_size / 2 ** 20:.1f}")
+    
+    with open('questao_2_snapshot_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados exportados para 'questao_2_snapshot_resultados.json'")
+
+def skewed_key_sets(n, seed):
+    """Conjuntos de n chaves: uniformes, múltiplos de 1024 (bits baixos iguais) e sequenciais."""
+    uniform = generate_random_keys(n, seed)
+    return {
+        'uniforme': uniform,
+        'multiplos_1024': [key * 1024 for key in uniform],
+        'sequencial': list(range(n))
+    }
+
+def run_hash_family_experiment():
+    print("=== Famílias de funções hash: splits e cadeias de overflow ===\n")
+    
+    page_capacity = 10
+    n = 20000
+    # limita o diretório para que as colisões nos bits baixos virem cadeias de overflow
+    max_global_depth = 16
+    seed = random.getrandbits(64)
+    key_sets = skewed_key_sets(n, seed)
+    
+    tables = {
+        'extensible': lambda hash_function: ExtensibleHashing(
+            page_capacity, max_global_depth=max_global_depth, hash_function=hash_function),
+        'linear': lambda hash_function: LinearHashing(
+            page_capacity, alpha_max=0.75, hash_function=hash_function)
+    }
+    
+    results = {'page_capacity': page_capacity, 'n': n, 'max_global_depth': max_global_depth, 'runs': []}
+    
+    print("Estrutura\tChaves\t\tFamília\t\tSplits\tCadeia máx.\tCadeia média\tEspaço\tEsforço(I/O)")
+    print("-" * 110)
+    for table_name, make_table in tables.items():
+        for key_set_name, keys in key_sets.items():
+            for family_name in HASH_FAMILIES:
+                table = make_table(make_hash_function(family_name, seed))
+                for key in keys:
+                    table.insert(key)
+                
+                lengths = table.get_chain_lengths()
+                run = {
+                    'structure': table_name,
+                    'keys': key_set_name,
+                    'family': family_name,
+                    'splits': table.num_splits,
+                    'max_chain': max(lengths),
+                    'avg_chain': sum(lengths) / len(lengths),
+                    'overflow_pages': table.num_overflow_pages,
+                    'space': table.get_space_usage(),
+                    'io_cost': table.io_cost
+                }
+                results['runs'].append(run)
+                print(f"{table_name}\t{key_set_name:<14}\t{family_name:<14}\t{run['splits']}\t"
+                      f"{run['max_chain']}\t\t{run['avg_chain']:.2f}\t\t{run['space']}\t{run['io_cost']}")
+    
+    with open('questao_2_familias_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados exportados para 'questao_2_familias_resultados.json'")
+
+def run_guard_experiment():
+    print("=== Filtro de Bloom na frente das tabelas: I/O economizado vs memória ===\n")
+    
+    page_capacity = 10
+    n = 20000
+    alpha_max_values = [0.6, 0.9, 2.0]
+    bits_per_key_values = [None, 4, 8, 16, 32, 64]
+    miss_ratios = [0.1, 0.5, 0.9]
+    num_queries = 5000
+    seed = random.getrandbits(64)
+    # n chaves inseridas e, disjuntas delas, as chaves das buscas malsucedidas
+    keys = generate_random_keys(2 * n, seed)
+    insert_keys = keys[:n]
+    present_keys = insert_keys[:num_queries]
+    missing_keys = keys[n:n + num_queries]
+    
+    configurations = [('extensible', None)] + [('linear', alpha_max) for alpha_max in alpha_max_values]
+    
+    def make_table(structure, alpha_max, guard):
+        if structure == 'extensible':
+            return ExtensibleHashing(page_capacity, guard=guard)
+        return LinearHashing(page_capacity, alpha_max=alpha_max, guard=guard)
+    
+    results = {'page_capacity': page_capacity, 'n': n, 'num_queries': num_queries, 'runs': []}
+    
+    print("Estrutura\tα_max\tBits/chave\tFiltro(KiB)\tPáginas(KiB)\tFP Filtro\tI/O Inserção\t"
+          + "\t".join(f"I/O busca {ratio:.0%} miss" for ratio in miss_ratios))
+    print("-" * 170)
+    for structure, alpha_max in configurations:
+        baseline = None
+        for bits_per_key in bits_per_key_values:
+            guard = None if bits_per_key is None else BloomGuard(bits_per_key=bits_per_key, seed=seed)
+            table = make_table(structure, alpha_max, guard)
+            for key in insert_keys:
+                table.insert(key)
+            insert_cost = table.io_cost
+            
+            hit_cost, miss_cost = measure_search_cost(table, present_keys, missing_keys)
+            lookup_costs = {ratio: (1 - ratio) * hit_cost + ratio * miss_cost for ratio in miss_ratios}
+            if baseline is None:
+                baseline = lookup_costs
+            
+            guard_bytes = 0 if guard is None else guard.memory_bytes()
+            fp_rate = 1.0 if guard is None else sum(guard.filter.contains(key) for key in missing_keys) / num_queries
+            run = {
+                'structure': structure,
+                'alpha_max': alpha_max,
+                'bits_per_key': bits_per_key,
+                'guard_bytes': guard_bytes,
+                'guard_stats': None if guard is None else guard.get_stats(),
+                'table_bytes': table.memory_bytes() - guard_bytes,
+                'fpRateGuard': fp_rate,
+                'insert_io': insert_cost,
+                'search_hit_io': hit_cost,
+                'search_miss_io': miss_cost,
+                'lookup_io': {str(ratio): cost for ratio, cost in lookup_costs.items()},
+                'io_saved': {str(ratio): 1 - lookup_costs[ratio] / baseline[ratio] for ratio in miss_ratios}
+            }
+            results['runs'].append(run)
+            cells = [f"{lookup_costs[ratio]:.3f} ({run['io_saved'][str(ratio)]:+.0%})" for ratio in miss_ratios]
+            print(f"{structure}\t{alpha_max if alpha_max is not None else '-'}\t{bits_per_key or '-'}\t\t"
+                  f"{guard_bytes / 1024:.1f}\t\t{run['table_bytes'] / 1024:.1f}\t\t{fp_rate:.4f}\t\t"
+                  f"{insert_cost}\t\t" + "\t\t".join(cells))
+    
+    with open('questao_2_guarda_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados exportados para 'questao_2_guarda_resultados.json'")
+
+EXPERIMENTS = {
+    'padrao': run_experiment,
+    'disco': run_disk_experiment,
+    'grade': run_grid_experiment,
+    'familias': run_hash_family_experiment,
+    'duplicacao': run_doubling_experiment,
+    'particionado': run_sharded_experiment,
+    'snapshot': run_snapshot_experiment,
+    'guarda': run_guard_experiment
+}
 
 if __name__ == '__main__':
-    run_experiment() 
+    parser = argparse.ArgumentParser(description="Estudo comparativo entre hash extensível e hash linear")
+    parser.add_argument('modo', nargs='?', default='padrao', choices=list(EXPERIMENTS),
+                        help="experimento a executar (padrão: o estudo original)")
+    parser.add_argument('--eventos', action='store_true',
+                        help="no estudo original, grava também o trace completo dos eventos estruturais")
+    args = parser.parse_args()
+    if args.modo == 'padrao':
+        run_experiment(dump_events=args.eventos)
+    else:
+        EXPERIMENTS[args.modo]()
+
@@ -1,30 +1,55 @@
-import json
+import os
+import sys
+
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from colunar import ColumnStore
+
 def plot_results():
-    with open('questao_2_resultados.json', 'r') as f:
-        data = json.load(f)
+    # curvas densas: um ponto por checkpoint (a cada 1% do maior n) de uma única tabela
+    # crescente; as linhas estão agrupadas por configuração, então cada coluna vira uma
+    # matriz configurações × checkpoints e a curva da configuração i é a linha i
+    curves = ColumnStore('questao_2_curvas')
+    columns = curves.read()
+    structures = curves.metadata['structures']
+    n_values = curves.metadata['checkpoints']
+    space = columns['space'].reshape(len(structures), len(n_values))
+    effort = columns['effort'].reshape(len(structures), len(n_values))
+    extensible_row = structures.index('extensible')
+    linear_rows = [(i, alpha) for i, (structure, alpha) in enumerate(zip(structures, curves.metadata['alpha_max']))
+                   if structure == 'linear']
+    tree_rows = [(i, f'{convention}={order}') for i, (structure, convention, order)
+                 in enumerate(zip(structures, curves.metadata['convention'], curves.metadata['order']))
+                 if structure == 'bplus']
 
     plt.style.use('seaborn-v0_8-whitegrid')
     _, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
 
-    n_values = list(range(1000, 1000 + len(data['extensible']['space']) * 1000, 1000))
+    marker_step = max(1, len(n_values) // 10)
 
     ax1.set_title('Espaço Requerido vs. Número de Registros', fontsize=14)
     ax1.set_xlabel('Número de Registros (n)')
     ax1.set_ylabel('Espaço Total (Slots)')
 
-    ax1.plot(n_values, data['extensible']['space'],
-             marker='o', linestyle='--', label='Hash Extensível', color='red', linewidth=2)
+    ax1.plot(n_values, space[extensible_row],
+             marker='o', markevery=marker_step, linestyle='--', label='Hash Extensível', color='red', linewidth=2)
 
     colors = ['blue', 'green', 'orange']
     markers = ['s', '^', 'D']
+    tree_colors = ['purple', 'brown']
+    tree_markers = ['v', 'P']
     
-    for i, (alpha, values) in enumerate(data['linear'].items()):
-        ax1.plot(n_values, values['space'],
-                 marker=markers[i], linestyle='-', label=f'Hash Linear (α_max={alpha})', 
+    for i, (row, alpha) in enumerate(linear_rows):
+        ax1.plot(n_values, space[row],
+                 marker=markers[i], markevery=marker_step, linestyle='-', label=f'Hash Linear (α_max={alpha})', 
                  color=colors[i], linewidth=2)
 
+    for i, (row, label) in enumerate(tree_rows):
+        ax1.plot(n_values, space[row],
+                 marker=tree_markers[i], markevery=marker_step, linestyle='-.', label=f'Árvore B+ ({label})',
+                 color=tree_colors[i], linewidth=2)
+
     ax1.legend()
     ax1.grid(True, which='both', linestyle='--', linewidth=0.5)
 
@@ -32,14 +57,19 @@ def plot_results():
     ax2.set_xlabel('Número de Registros (n)')
     ax2.set_ylabel('Esforço Total (Acessos à Página)')
 
-    ax2.plot(n_values, data['extensible']['effort'],
-             marker='o', linestyle='--', label='Hash Extensível', color='red', linewidth=2)
+    ax2.plot(n_values, effort[extensible_row],
+             marker='o', markevery=marker_step, linestyle='--', label='Hash Extensível', color='red', linewidth=2)
 
-    for i, (alpha, values) in enumerate(data['linear'].items()):
-        ax2.plot(n_values, values['effort'],
-                 marker=markers[i], linestyle='-', label=f'Hash Linear (α_max={alpha})', 
+    for i, (row, alpha) in enumerate(linear_rows):
+        ax2.plot(n_values, effort[row],
+                 marker=markers[i], markevery=marker_step, linestyle='-', label=f'Hash Linear (α_max={alpha})', 
                  color=colors[i], linewidth=2)
 
+    for i, (row, label) in enumerate(tree_rows):
+        ax2.plot(n_values, effort[row],
+                 marker=tree_markers[i], markevery=marker_step, linestyle='-.', label=f'Árvore B+ ({label})',
+                 color=tree_colors[i], linewidth=2)
+
     ax2.legend()
     ax2.grid(True, which='both', linestyle='--', linewidth=0.5)
 
@@ -56,6 +86,7 @@ def plot_results():
     print("\nESFORÇO DE INSERÇÃO:")
     print("- Hash Extensível tem menor esforço de inserção")
     print("- Hash Linear com α_max maior tem maior esforço (mais colisões)")
+    print("- Árvore B+ tem o maior esforço: cada inserção lê um nó por nível da árvore")
     
     print("\nGráficos salvos em 'comparativo_hash.png'")
 
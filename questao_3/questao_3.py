@@ -2,53 +2,632 @@ import random
 import json
 import time
 import math
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from multiprocessing import Pool
+
+import numpy as np
+
+# bytes lidos por vez na contagem de bits ligados
+POPCOUNT_CHUNK_BYTES = 1 << 20
+# chaves processadas por vez em insert_many/contains_many (matriz n × BATCH_KEYS de posições)
+BATCH_KEYS = 1 << 16
+# primo de Mersenne 2^31 - 1: corpo de onde a_source='prime_field' sorteia a e b
+MERSENNE_PRIME_31 = (1 << 31) - 1
+# grade teórica k × m × n do experimento padrão (.npz) e medições (colunas anexáveis)
+THEORY_FILE = 'questao_3_teoria.npz'
+EXPERIMENTS_STORE = 'questao_3_experimentos'
+# formato do arquivo de BloomFilter.save: BLOOM_FILE_HEADER (assinatura, versão, esquema,
+# origem de a, se há semente, m, n, semente, número de funções), os pares (a, b) em int64,
+# preenchimento até um múltiplo de BLOOM_FILE_ALIGNMENT e o vetor de bits
+BLOOM_FILE_MAGIC = b'EDABLOOM'
+BLOOM_FILE_VERSION = 1
+BLOOM_FILE_HEADER = struct.Struct('<8sIBBBxqqQI')
+BLOOM_FILE_ALIGNMENT = 4096
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from experimentos import run_grid, summarize, stream_random_keys
+from colunar import ColumnStore, save_grid, load_grid, axis_index
 
 class BloomFilter:
-    def __init__(self, m, n):
+    HASH_SCHEMES = ('independent', 'double')
+    A_SOURCES = ('small_primes', 'prime_field')
+    
+    def __init__(self, m, n, hash_scheme='independent', a_source='small_primes', seed=None):
         """
         m: número de bits do filtro
         n: número de funções hashing
+        hash_scheme: 'independent' (padrão): n funções (a_i * x + b_i) com parâmetros próprios;
+            'double': só duas funções base h1 e h2, e a i-ésima posição é (h1 + i * h2) mod m
+            (Kirsch–Mitzenmacher)
+        a_source: 'small_primes' (padrão): a sorteado entre 30 primos pequenos e
+            h(x) = (a * x + b) mod m; 'prime_field': a e b uniformes no corpo de
+            p = 2^31 - 1 e h(x) = ((a * x + b) mod p) mod m
+        seed: se dada, os parâmetros das funções hash são sorteados por random.Random(seed),
+            então filtros com a mesma semente (e m, n, esquemas) são compatíveis; senão, pelo
+            gerador global do módulo random
         """
+        if hash_scheme not in self.HASH_SCHEMES:
+            raise ValueError(f"hash_scheme deve ser um de {self.HASH_SCHEMES}")
+        if a_source not in self.A_SOURCES:
+            raise ValueError(f"a_source deve ser um de {self.A_SOURCES}")
         self.m = m
         self.n = n
-        self.bit_array = [False] * m
+        self.hash_scheme = hash_scheme
+        self.a_source = a_source
+        self.seed = seed
+        self.modulus = MERSENNE_PRIME_31 if a_source == 'prime_field' else m
+        # bit i do filtro: bit (i & 7) do byte i >> 3
+        self.bit_array = bytearray((m + 7) // 8)
+        # mmap do arquivo de onde o filtro foi aberto por load()
+        self.mapping = None
         self.hash_params = []
         
-        for _ in range(n):
-            self.hash_params.append({
-                'a': self._generate_random_prime(),
-                'b': random.randint(0, m - 1)
-            })
+        rng = random if seed is None else random.Random(seed)
+        for _ in range(2 if hash_scheme == 'double' else n):
+            if a_source == 'prime_field':
+                params = {'a': rng.randint(1, MERSENNE_PRIME_31 - 1), 'b': rng.randint(0, MERSENNE_PRIME_31 - 1)}
+            else:
+                params = {'a': self._generate_random_prime(rng), 'b': rng.randint(0, m - 1)}
+            self.hash_params.append(params)
+        self._build_hash_columns()
     
-    def _generate_random_prime(self):
+    def _build_hash_columns(self):
+        # os mesmos parâmetros como colunas, para calcular as posições de um lote de chaves de uma vez;
+        # com o módulo abaixo de 2^32, (a mod p) * (x mod p) + b cabe em 64 bits sem estourar
+        dtype = np.uint64 if self.modulus < 1 << 32 else object
+        self.a_column = np.array([[params['a'] % self.modulus] for params in self.hash_params], dtype=dtype)
+        self.b_column = np.array([[params['b']] for params in self.hash_params], dtype=dtype)
+    
+    def _generate_random_prime(self, rng=random):
         primes = [31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97,
                   101, 103, 107, 109, 113, 127, 131, 137, 139, 149, 151, 157, 163, 167, 173]
-        return random.choice(primes)
+        return rng.choice(primes)
+    
+    def _base_hash(self, key, params):
+        return (params['a'] * key + params['b']) % self.modulus % self.m
+    
+    def _double_hashes(self, key):
+        h1 = self._base_hash(key, self.hash_params[0])
+        # h2 nunca é 0 (mod m), senão todas as posições coincidiriam
+        h2 = 1 + self._base_hash(key, self.hash_params[1]) % (self.m - 1) if self.m > 1 else 0
+        return h1, h2
     
     def hash(self, key, i):
-        params = self.hash_params[i]
-        return (params['a'] * key + params['b']) % self.m
+        if self.hash_scheme == 'double':
+            h1, h2 = self._double_hashes(key)
+            return (h1 + i * h2) % self.m
+        return self._base_hash(key, self.hash_params[i])
+    
+    def _indexes(self, key):
+        if self.hash_scheme == 'double':
+            h1, h2 = self._double_hashes(key)
+            for i in range(self.n):
+                yield (h1 + i * h2) % self.m
+        else:
+            for params in self.hash_params:
+                yield self._base_hash(key, params)
     
     def insert(self, key):
-        for i in range(self.n):
-            index = self.hash(key, i)
-            self.bit_array[index] = True
+        for index in self._indexes(key):
+            self.bit_array[index >> 3] |= 1 << (index & 7)
     
     def contains(self, key):
+        for index in self._indexes(key):
+            if not self.bit_array[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+    
+    def positions_many(self, keys):
+        """Matriz n × len(keys) com a posição de cada chave em cada função hash."""
+        keys = np.asarray(keys, dtype=self.a_column.dtype)
+        base = (self.a_column * (keys % self.modulus) + self.b_column) % self.modulus % self.m
+        if self.hash_scheme == 'independent':
+            return base
+        h1, h2 = base
+        h2 = 1 + h2 % (self.m - 1) if self.m > 1 else h2 * 0
+        i_column = np.arange(self.n, dtype=self.a_column.dtype)[:, None]
+        return (h1 + i_column * h2) % self.m
+    
+    def insert_many(self, keys):
+        """Insere um vetor de chaves, ligando todos os bits de um lote de uma vez."""
+        bits = np.frombuffer(self.bit_array, dtype=np.uint8)
+        keys = np.asarray(keys)
+        for start in range(0, len(keys), BATCH_KEYS):
+            positions = np.unique(self.positions_many(keys[start:start + BATCH_KEYS]).astype(np.int64))
+            byte_indexes = positions >> 3
+            masks = (1 << (positions & 7)).astype(np.uint8)
+            # posições distintas de um mesmo byte são juntadas antes de atualizar o vetor
+            first = np.flatnonzero(np.r_[True, byte_indexes[1:] != byte_indexes[:-1]])
+            bits[byte_indexes[first]] |= np.bitwise_or.reduceat(masks, first)
+    
+    def contains_many(self, keys):
+        """Vetor de bool: se cada chave de keys pode estar no filtro."""
+        bits = np.frombuffer(self.bit_array, dtype=np.uint8)
+        keys = np.asarray(keys)
+        found = np.empty(len(keys), dtype=np.bool_)
+        for start in range(0, len(keys), BATCH_KEYS):
+            positions = self.positions_many(keys[start:start + BATCH_KEYS]).astype(np.int64)
+            set_bits = (bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1
+            found[start:start + BATCH_KEYS] = set_bits.all(axis=0)
+        return found
+    
+    def get_bit_count(self):
+        bits = memoryview(self.bit_array)
+        return sum(
+            int.from_bytes(bits[start:start + POPCOUNT_CHUNK_BYTES], 'little').bit_count()
+            for start in range(0, len(bits), POPCOUNT_CHUNK_BYTES)
+        )
+    
+    def get_fill_ratio(self):
+        return self.get_bit_count() / self.m
+    
+    def memory_bytes(self):
+        return sys.getsizeof(self.bit_array)
+    
+    def save(self, path):
+        """
+        Grava o filtro em path (formato descrito em BLOOM_FILE_HEADER): cabeçalho com os
+        parâmetros das funções hash e o vetor de bits, alinhado para ser mapeado por load().
+        """
+        if type(self) is not BloomFilter:
+            raise TypeError(f"{type(self).__name__} não pode ser gravado; só o BloomFilter")
+        has_seed = self.seed is not None
+        if has_seed and not (isinstance(self.seed, int) and 0 <= self.seed < 1 << 64):
+            raise ValueError("Só sementes inteiras de 64 bits sem sinal podem ser gravadas")
+        params = array('q', [value for p in self.hash_params for value in (p['a'], p['b'])])
+        with open(path, 'wb') as f:
+            f.write(BLOOM_FILE_HEADER.pack(
+                BLOOM_FILE_MAGIC, BLOOM_FILE_VERSION,
+                self.HASH_SCHEMES.index(self.hash_scheme), self.A_SOURCES.index(self.a_source), has_seed,
+                self.m, self.n, self.seed if has_seed else 0, len(self.hash_params)
+            ))
+            params.tofile(f)
+            f.write(bytes(-f.tell() % BLOOM_FILE_ALIGNMENT))
+            f.write(self.bit_array)
+    
+    @classmethod
+    def load(cls, path, writable=False):
+        """
+        Abre um filtro gravado por save() sem copiar o vetor de bits: o arquivo é mapeado
+        com mmap e bit_array passa a ser uma memoryview do mapeamento. Só o cabeçalho é
+        lido, então o tempo não depende de m, e processos que abrem o mesmo arquivo
+        compartilham as páginas do cache do sistema operacional.
+        writable=False: mapeamento somente leitura (inserir levanta erro)
+        writable=True: inserções alteram o arquivo
+        """
+        with open(path, 'r+b' if writable else 'rb') as f:
+            header = f.read(BLOOM_FILE_HEADER.size)
+            if len(header) < BLOOM_FILE_HEADER.size:
+                raise ValueError(f"{path} não é um arquivo de filtro de Bloom")
+            magic, version, scheme, source, has_seed, m, n, seed, num_params = BLOOM_FILE_HEADER.unpack(header)
+            if magic != BLOOM_FILE_MAGIC:
+                raise ValueError(f"{path} não é um arquivo de filtro de Bloom")
+            if version != BLOOM_FILE_VERSION:
+                raise ValueError(f"Versão de arquivo de filtro não suportada: {version}")
+            params = array('q')
+            params.fromfile(f, 2 * num_params)
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        
+        offset = -(-(BLOOM_FILE_HEADER.size + 2 * num_params * params.itemsize) // BLOOM_FILE_ALIGNMENT) * BLOOM_FILE_ALIGNMENT
+        size = (m + 7) // 8
+        if len(mapping) < offset + size:
+            mapping.close()
+            raise ValueError(f"{path} está truncado")
+        bloom = BloomFilter.__new__(BloomFilter)
+        bloom.m = m
+        bloom.n = n
+        bloom.hash_scheme = cls.HASH_SCHEMES[scheme]
+        bloom.a_source = cls.A_SOURCES[source]
+        bloom.seed = seed if has_seed else None
+        bloom.modulus = MERSENNE_PRIME_31 if bloom.a_source == 'prime_field' else m
+        bloom.hash_params = [{'a': params[i], 'b': params[i + 1]} for i in range(0, len(params), 2)]
+        bloom._build_hash_columns()
+        bloom.mapping = mapping
+        bloom.bit_array = memoryview(mapping)[offset:offset + size]
+        return bloom
+    
+    def flush(self):
+        """Grava no arquivo as inserções feitas em um filtro aberto com load(writable=True)."""
+        if self.mapping is not None:
+            self.mapping.flush()
+    
+    def close(self):
+        """Desfaz o mapeamento de um filtro aberto por load(); o filtro não pode mais ser usado."""
+        if self.mapping is not None:
+            self.bit_array.release()
+            self.mapping.close()
+            self.mapping = None
+    
+    def is_compatible(self, other):
+        """Se other tem o mesmo m e as mesmas funções hash, ou seja, liga os mesmos bits para cada chave."""
+        return (type(self) is type(other) and self.m == other.m and self.n == other.n
+                and self.hash_scheme == other.hash_scheme and self.a_source == other.a_source
+                and self.hash_params == other.hash_params)
+    
+    def _combine(self, other, operation):
+        if not self.is_compatible(other):
+            raise ValueError("Os filtros precisam ter o mesmo m e as mesmas funções hash (mesma semente)")
+        result = type(self).__new__(type(self))
+        vars(result).update(vars(self))
+        result.mapping = None
+        result.bit_array = bytearray(len(self.bit_array))
+        operation(np.frombuffer(self.bit_array, dtype=np.uint8), np.frombuffer(other.bit_array, dtype=np.uint8),
+                  out=np.frombuffer(result.bit_array, dtype=np.uint8))
+        return result
+    
+    def union(self, other):
+        """Filtro (em memória) com as chaves dos dois: OR dos vetores de bits."""
+        return self._combine(other, np.bitwise_or)
+    
+    def intersection(self, other):
+        """
+        AND dos vetores de bits: contém as chaves comuns aos dois, mas tem mais falsos
+        positivos que um filtro construído só com elas.
+        """
+        return self._combine(other, np.bitwise_and)
+
+class BlockedBloomFilter(BloomFilter):
+    """
+    Filtro de Bloom em blocos: cada chave escolhe um bloco de BLOCK_BITS bits (uma linha
+    de cache de 64 bytes) e liga os seus n bits dentro dele, então uma consulta toca uma
+    só linha de cache. O bloco vem de uma função (a * x + b) como as do BloomFilter e as
+    posições dentro dele de duas outras, por double hashing "melhorado":
+    first + i * step + (i^3 - i) / 6. O termo cúbico evita que chaves com o mesmo passo
+    gerem progressões deslocadas que quase coincidem dentro do bloco.
+    """
+    BLOCK_BITS = 512
+    
+    def __init__(self, m, n, a_source='small_primes', seed=None):
+        """
+        m: número de bits do filtro (arredondado para um múltiplo de BLOCK_BITS)
+        n: número de bits ligados por chave
+        a_source, seed: como em BloomFilter
+        """
+        if not 1 <= n <= self.BLOCK_BITS:
+            raise ValueError(f"n deve estar entre 1 e {self.BLOCK_BITS}")
+        num_blocks = max(1, -(-m // self.BLOCK_BITS))
+        # três funções base: bloco, posição inicial e passo dentro do bloco
+        super().__init__(num_blocks * self.BLOCK_BITS, 3, a_source=a_source, seed=seed)
+        self.n = n
+        self.num_blocks = num_blocks
+    
+    def _block_hashes(self, key):
+        block, first, step = (
+            (params['a'] * key + params['b']) % self.modulus for params in self.hash_params
+        )
+        return block % self.num_blocks * self.BLOCK_BITS, first % self.BLOCK_BITS, step % self.BLOCK_BITS
+    
+    def hash(self, key, i):
+        base, first, step = self._block_hashes(key)
+        return base + (first + i * step + (i ** 3 - i) // 6) % self.BLOCK_BITS
+    
+    def _indexes(self, key):
+        base, first, step = self._block_hashes(key)
         for i in range(self.n):
-            index = self.hash(key, i)
-            if not self.bit_array[index]:
+            yield base + (first + i * step + (i ** 3 - i) // 6) % self.BLOCK_BITS
+    
+    def positions_many(self, keys):
+        keys = np.asarray(keys, dtype=self.a_column.dtype)
+        block, first, step = (self.a_column * (keys % self.modulus) + self.b_column) % self.modulus
+        base = block % self.num_blocks * self.BLOCK_BITS
+        i_column = np.arange(self.n, dtype=self.a_column.dtype)[:, None]
+        return base + (first + i_column * step + (i_column ** 3 - i_column) // 6) % self.BLOCK_BITS
+
+def calculate_blocked_P_probability(m, n, k, block_bits=BlockedBloomFilter.BLOCK_BITS):
+    """
+    Probabilidade de falso positivo do filtro em blocos: o número de chaves em um bloco
+    segue aproximadamente Poisson(k / número de blocos), e dentro de um bloco com j
+    chaves vale a fórmula de P com m = block_bits, k = j.
+    """
+    num_blocks = max(1, -(-m // block_bits))
+    load = k / num_blocks
+    if load == 0:
+        return 0.0
+    # a soma cobre a média ± 10 desvios padrão; os pesos são calculados em escala log
+    spread = 10 * math.sqrt(load) + 10
+    probability = 0.0
+    for j in range(max(0, int(load - spread)), int(load + spread) + 1):
+        weight = math.exp(j * math.log(load) - load - math.lgamma(j + 1))
+        probability += weight * calculate_P_probability(block_bits, n, j)
+    return probability
+
+class CountingBloomFilter(BloomFilter):
+    """
+    Filtro de Bloom com contadores de COUNTER_BITS bits no lugar dos bits, dois por byte
+    (o contador i é o nibble i & 1 do byte i >> 1). Inserir incrementa os n contadores da
+    chave e remove(key) os decrementa, então chaves podem sair sem reconstruir o filtro.
+    Um contador que chega a COUNTER_MAX fica saturado: não é mais incrementado nem
+    decrementado, porque o número real de chaves nele se perdeu (o filtro continua sem
+    falsos negativos, só deixa de liberar aquela posição). As funções hash são as mesmas
+    do BloomFilter, e to_bloom_filter() exporta o filtro de bits equivalente.
+    """
+    COUNTER_BITS = 4
+    COUNTER_MAX = (1 << COUNTER_BITS) - 1
+    
+    def __init__(self, m, n, hash_scheme='independent', a_source='small_primes', seed=None):
+        """Mesmos parâmetros do BloomFilter."""
+        super().__init__(m, n, hash_scheme, a_source, seed)
+        # o vetor de bits dá lugar aos contadores
+        del self.bit_array
+        self.counters = bytearray((m + 1) // 2)
+    
+    def _counter(self, index):
+        return (self.counters[index >> 1] >> ((index & 1) << 2)) & self.COUNTER_MAX
+    
+    def insert(self, key):
+        for index in self._indexes(key):
+            if self._counter(index) < self.COUNTER_MAX:
+                self.counters[index >> 1] += 1 << ((index & 1) << 2)
+    
+    def contains(self, key):
+        for index in self._indexes(key):
+            if not self._counter(index):
                 return False
         return True
     
+    def remove(self, key):
+        """
+        Remove key, se contains(key); retorna se removeu. Remover uma chave que nunca foi
+        inserida (um falso positivo) decrementa contadores de outras chaves e pode criar
+        falsos negativos.
+        """
+        if not self.contains(key):
+            return False
+        for index in self._indexes(key):
+            if self._counter(index) < self.COUNTER_MAX:
+                self.counters[index >> 1] -= 1 << ((index & 1) << 2)
+        return True
+    
+    def _counters_at(self, counters, positions):
+        return (counters[positions >> 1] >> ((positions & 1) << 2).astype(np.uint8)) & np.uint8(self.COUNTER_MAX)
+    
+    def _add_to_counters(self, keys, sign):
+        """Soma sign vezes o número de ocorrências de cada posição de um lote, com saturação."""
+        counters = np.frombuffer(self.counters, dtype=np.uint8)
+        for start in range(0, len(keys), BATCH_KEYS):
+            positions, counts = np.unique(self.positions_many(keys[start:start + BATCH_KEYS]).astype(np.int64),
+                                          return_counts=True)
+            old = self._counters_at(counters, positions).astype(np.int64)
+            new = np.clip(old + sign * counts, 0, self.COUNTER_MAX)
+            new[old == self.COUNTER_MAX] = self.COUNTER_MAX
+            new = new.astype(np.uint8)
+            # as posições são distintas, então cada byte aparece no máximo uma vez entre as pares
+            # (nibble baixo) e uma vez entre as ímpares (nibble alto)
+            low = (positions & 1) == 0
+            byte_indexes = positions[low] >> 1
+            counters[byte_indexes] = (counters[byte_indexes] & np.uint8(0xF0)) | new[low]
+            byte_indexes = positions[~low] >> 1
+            counters[byte_indexes] = (counters[byte_indexes] & np.uint8(0x0F)) | (new[~low] << np.uint8(4))
+    
+    def insert_many(self, keys):
+        self._add_to_counters(np.asarray(keys), 1)
+    
+    def remove_many(self, keys):
+        """
+        Remove as chaves de um vetor que o filtro contém no início do lote; retorna o vetor
+        de bool de quais foram removidas.
+        """
+        keys = np.asarray(keys)
+        present = self.contains_many(keys)
+        self._add_to_counters(keys[present], -1)
+        return present
+    
+    def contains_many(self, keys):
+        counters = np.frombuffer(self.counters, dtype=np.uint8)
+        keys = np.asarray(keys)
+        found = np.empty(len(keys), dtype=np.bool_)
+        for start in range(0, len(keys), BATCH_KEYS):
+            positions = self.positions_many(keys[start:start + BATCH_KEYS]).astype(np.int64)
+            found[start:start + BATCH_KEYS] = self._counters_at(counters, positions).all(axis=0)
+        return found
+    
+    def _nonzero_counters(self):
+        """Vetor de bool de m posições: se o contador de cada uma é diferente de zero."""
+        return self._unpack_counters()[:self.m] != 0
+    
+    def get_bit_count(self):
+        return int(np.count_nonzero(self._nonzero_counters()))
+    
+    def get_saturated_count(self):
+        counters = np.frombuffer(self.counters, dtype=np.uint8)
+        return int(np.count_nonzero((counters & np.uint8(0x0F)) == self.COUNTER_MAX)
+                   + np.count_nonzero((counters >> np.uint8(4)) == self.COUNTER_MAX))
+    
+    def _unpack_counters(self):
+        """Vetor de 2 * len(counters) contadores, um por posição (o último sobra se m for ímpar)."""
+        counters = np.frombuffer(self.counters, dtype=np.uint8)
+        unpacked = np.empty(2 * len(counters), dtype=np.uint8)
+        unpacked[0::2] = counters & np.uint8(0x0F)
+        unpacked[1::2] = counters >> np.uint8(4)
+        return unpacked
+    
+    def _combine(self, other, operation):
+        if not self.is_compatible(other):
+            raise ValueError("Os filtros precisam ter o mesmo m e as mesmas funções hash (mesma semente)")
+        combined = operation(self._unpack_counters(), other._unpack_counters())
+        result = type(self).__new__(type(self))
+        vars(result).update(vars(self))
+        result.counters = bytearray((combined[0::2] | (combined[1::2] << np.uint8(4))).tobytes())
+        return result
+    
+    def union(self, other):
+        """
+        Soma dos contadores, saturada em COUNTER_MAX: o filtro conta as chaves dos dois, então
+        uma chave de qualquer um deles pode ser removida depois.
+        """
+        return self._combine(other, lambda a, b: np.minimum(a.astype(np.int16) + b, self.COUNTER_MAX)
+                             .astype(np.uint8))
+    
+    def intersection(self, other):
+        """
+        Mínimo dos contadores: contém as chaves comuns aos dois, com mais falsos positivos
+        que um filtro construído só com elas.
+        """
+        return self._combine(other, np.minimum)
+    
+    def to_bloom_filter(self):
+        """
+        BloomFilter de bits com as mesmas funções hash, com o bit i ligado onde o contador i
+        é diferente de zero: responde contains igual a este filtro, com m / 8 bytes.
+        """
+        bloom = BloomFilter.__new__(BloomFilter)
+        vars(bloom).update({name: value for name, value in vars(self).items() if name != 'counters'})
+        bloom.bit_array = bytearray(np.packbits(self._nonzero_counters(), bitorder='little').tobytes())
+        return bloom
+    
+    def memory_bytes(self):
+        return sys.getsizeof(self.counters)
+
+class ScalableBloomFilter:
+    """
+    Filtro de Bloom escalável (Almeida et al.): uma sequência de BloomFilters em que só o
+    último recebe inserções. Quando o fill ratio dele passa de fill_threshold, um novo
+    sub-filtro é criado com capacidade growth_factor vezes maior e taxa de erro
+    tightening_ratio vezes menor. Com taxas p_0 * r^i e p_0 = error_rate * (1 - r), a soma
+    das taxas de todos os sub-filtros nunca passa de error_rate, qualquer que seja k.
+    """
+    
+    def __init__(self, initial_capacity, error_rate=0.01, growth_factor=2, tightening_ratio=0.85,
+                 fill_threshold=0.5, hash_scheme='independent', a_source='prime_field'):
+        """
+        initial_capacity: número de chaves previsto para o primeiro sub-filtro
+        error_rate: taxa de falso positivo alvo do filtro inteiro
+        growth_factor: razão entre as capacidades de sub-filtros consecutivos
+        tightening_ratio: razão entre as taxas de erro de sub-filtros consecutivos (0 < r < 1)
+        fill_threshold: fill ratio a partir do qual o sub-filtro ativo é fechado (0,5 é o
+            fill ratio de um filtro com n ótimo na sua capacidade)
+        hash_scheme, a_source: repassados aos sub-filtros; o padrão é 'prime_field', já que
+            com os primos pequenos a taxa observada fica bem acima da projetada
+        """
+        if initial_capacity < 1:
+            raise ValueError("initial_capacity deve ser pelo menos 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate deve estar entre 0 e 1")
+        if not 0 < tightening_ratio < 1:
+            raise ValueError("tightening_ratio deve estar entre 0 e 1")
+        if growth_factor < 1:
+            raise ValueError("growth_factor deve ser pelo menos 1")
+        if not 0 < fill_threshold < 1:
+            raise ValueError("fill_threshold deve estar entre 0 e 1")
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth_factor = growth_factor
+        self.tightening_ratio = tightening_ratio
+        self.fill_threshold = fill_threshold
+        self.hash_scheme = hash_scheme
+        self.a_source = a_source
+        self.filters = []
+        # chaves inseridas em cada sub-filtro e bits ligados no sub-filtro ativo
+        self.filter_keys = []
+        self.active_bits = 0
+        self.m = 0
+        self._add_filter()
+    
+    def _add_filter(self):
+        i = len(self.filters)
+        capacity = math.ceil(self.initial_capacity * self.growth_factor ** i)
+        error_rate = self.error_rate * (1 - self.tightening_ratio) * self.tightening_ratio ** i
+        # tamanho ótimo para a capacidade e a taxa do sub-filtro: m = -c ln(p) / ln(2)^2
+        m = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        n = max(1, calculate_optimal_n(m, capacity))
+        self.filters.append(BloomFilter(m, n, self.hash_scheme, self.a_source))
+        self.filter_keys.append(0)
+        self.active_bits = 0
+        self.m += m
+    
+    def _keys_until_threshold(self, bloom):
+        """
+        Quantas chaves ainda cabem no sub-filtro ativo até o fill ratio esperado chegar a
+        fill_threshold: 1 - (1 - f)(1 - 1/m)^(n j) = limiar, resolvido para j.
+        """
+        fill = self.active_bits / bloom.m
+        if bloom.m == 1:
+            return 1
+        keys = math.log((1 - self.fill_threshold) / (1 - fill)) / (bloom.n * math.log1p(-1 / bloom.m))
+        return max(1, math.ceil(keys))
+    
+    def _check_threshold(self):
+        if self.active_bits >= self.fill_threshold * self.filters[-1].m:
+            self._add_filter()
+    
+    @property
+    def num_keys(self):
+        return sum(self.filter_keys)
+    
+    def insert(self, key):
+        active = self.filters[-1]
+        for index in active._indexes(key):
+            mask = 1 << (index & 7)
+            if not active.bit_array[index >> 3] & mask:
+                active.bit_array[index >> 3] |= mask
+                self.active_bits += 1
+        self.filter_keys[-1] += 1
+        self._check_threshold()
+    
+    def contains(self, key):
+        # do sub-filtro mais novo (com mais chaves) para o mais antigo, parando no primeiro que contém a chave
+        return any(bloom.contains(key) for bloom in reversed(self.filters))
+    
+    def insert_many(self, keys):
+        """
+        Insere um vetor de chaves. Cada lote vai inteiro para o sub-filtro ativo e tem o
+        tamanho estimado para levá-lo até fill_threshold; os bits são recontados depois
+        de cada lote, então o crescimento segue o fill ratio medido.
+        """
+        keys = np.asarray(keys)
+        start = 0
+        while start < len(keys):
+            active = self.filters[-1]
+            chunk = keys[start:start + self._keys_until_threshold(active)]
+            active.insert_many(chunk)
+            self.active_bits = active.get_bit_count()
+            self.filter_keys[-1] += len(chunk)
+            start += len(chunk)
+            self._check_threshold()
+    
+    def contains_many(self, keys):
+        """Vetor de bool; cada sub-filtro só consulta as chaves que os anteriores não encontraram."""
+        keys = np.asarray(keys)
+        found = np.zeros(len(keys), dtype=np.bool_)
+        pending = np.arange(len(keys))
+        for bloom in reversed(self.filters):
+            if not len(pending):
+                break
+            hits = bloom.contains_many(keys[pending])
+            found[pending[hits]] = True
+            pending = pending[~hits]
+        return found
+    
     def get_bit_count(self):
-        return sum(self.bit_array)
+        return sum(bloom.get_bit_count() for bloom in self.filters[:-1]) + self.active_bits
     
     def get_fill_ratio(self):
         return self.get_bit_count() / self.m
+    
+    def memory_bytes(self):
+        return sum(bloom.memory_bytes() for bloom in self.filters)
+    
+    def expected_fp_rate(self):
+        """1 - prod(1 - P_i), com P_i a probabilidade P de cada sub-filtro com as chaves que recebeu."""
+        probability_none = 1.0
+        for bloom, k in zip(self.filters, self.filter_keys):
+            probability_none *= 1 - calculate_P_probability(bloom.m, bloom.n, k)
+        return 1 - probability_none
 
-def generate_random_keys(count, max_val):
-    return list(random.sample(range(max_val), count))
+def generate_random_keys(count, max_val, seed=None, start=0):
+    """
+    count chaves distintas de [0, max_val); ver experimentos.stream_random_keys.
+    Com a mesma semente, faixas [start, start + count) disjuntas dão chaves disjuntas.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    return [key for chunk in stream_random_keys(count, max_val, seed, start=start) for key in chunk]
 
 def measure_time(func):
     start = time.time()
@@ -71,6 +650,16 @@ def calculate_P_probability(m, n, k):
     P = math.pow(1 - p0_nk, n)
     return P
 
+def calculate_P_grid(m, n, k):
+    """
+    calculate_P_probability sobre grades: m, n e k são escalares ou vetores NumPy que se
+    combinam por broadcasting (por exemplo m[:, None], n[None, :]), e o resultado tem a
+    forma combinada. (1 - 1/m)^(nk) é calculado como exp(nk * log1p(-1/m)).
+    """
+    m, n, k = (np.asarray(values, dtype=np.float64) for values in (m, n, k))
+    p0_nk = np.exp(n * k * np.log1p(-1 / m))
+    return np.where(n == 0, 0.0, (1 - p0_nk) ** n)
+
 def calculate_F_probability(P, alpha):
     """
     Calcula a probabilidade F de falso positivo considerando α
@@ -103,8 +692,9 @@ def run_experiment():
             'n_values_exp': n_values,
             'n_values_theory': n_values_theory
         },
-        'experiments': [],
-        'theory': [],
+        # a grade teórica e as medições ficam em formato colunar (colunar.py)
+        'theory_file': THEORY_FILE,
+        'experiments_store': EXPERIMENTS_STORE,
         'analysis': {}
     }
     
@@ -113,21 +703,17 @@ def run_experiment():
     print(f"Valores de n para teoria: 1 a 600 (passo 5)\n")
     
     print("Calculando valores teóricos...")
-    for k in k_values:
-        for m in m_values:
-            for n in n_values_theory:
-                P = calculate_P_probability(m, n, k)
-                alpha = k / (k * 10)
-                F = calculate_F_probability(P, alpha)
-                
-                results['theory'].append({
-                    'm': m,
-                    'n': n,
-                    'k': k,
-                    'alpha': alpha,
-                    'P': P,
-                    'F': F
-                })
+    # grade k × m × n calculada de uma vez por broadcasting
+    theory_axes = {'k': np.array(k_values), 'm': np.array(m_values), 'n': np.array(n_values_theory)}
+    P = calculate_P_grid(theory_axes['m'][None, :, None], theory_axes['n'][None, None, :],
+                         theory_axes['k'][:, None, None])
+    alpha = 0.1  # k / (k * 10): o universo tem 10 chaves por chave inserida
+    save_grid(THEORY_FILE, theory_axes, P=P, F=calculate_F_probability(P, alpha))
+    
+    experiments = ColumnStore(EXPERIMENTS_STORE, {
+        'm': np.int64, 'n': np.int64, 'k': np.int64, 'P': np.float64, 'fpRateObserved': np.float64,
+        'fillRatio': np.float64
+    })
     
     print("\nRealizando experimentos práticos para validação...")
     print("m\tk\tn\tP\t\tFP Obs.\t\tFill Ratio")
@@ -145,37 +731,24 @@ def run_experiment():
         
         num_tests = min(1000, k * 10)
         universe_size = k * 10
-        insert_keys = generate_random_keys(k, universe_size)
+        keys_seed = random.getrandbits(64)
+        insert_keys = np.array(generate_random_keys(k, universe_size, keys_seed))
+        # índices da permutação depois dos k inseridos: chaves que nunca foram inseridas
+        num_negative = min(num_tests, universe_size - k)
+        negative_keys = np.array(generate_random_keys(num_negative, universe_size, keys_seed, start=k))
         
         for n in [1, 5, 10, 20, 50]:
             bloom = BloomFilter(m, n)
+            bloom.insert_many(insert_keys)
             
-            for key in insert_keys:
-                bloom.insert(key)
-            
-            false_positives = 0
-            test_keys = generate_random_keys(num_tests, universe_size)
-            insert_set = set(insert_keys)
-            negative_test_keys = [key for key in test_keys if key not in insert_set]
-            
-            for key in negative_test_keys[:num_tests]:
-                if bloom.contains(key):
-                    false_positives += 1
+            false_positives = int(bloom.contains_many(negative_keys).sum())
+            num_queried = len(negative_keys)
             
-            fp_rate_observed = false_positives / len(negative_test_keys[:num_tests]) if negative_test_keys else 0
+            fp_rate_observed = false_positives / num_queried if num_queried else 0
             P = calculate_P_probability(m, n, k)
             fill_ratio = bloom.get_fill_ratio()
             
-            result = {
-                'm': m,
-                'n': n,
-                'k': k,
-                'P': P,
-                'fpRateObserved': fp_rate_observed,
-                'fillRatio': fill_ratio
-            }
-            
-            results['experiments'].append(result)
+            experiments.append(m=m, n=n, k=k, P=P, fpRateObserved=fp_rate_observed, fillRatio=fill_ratio)
             
             print(f"{m}\t{k}\t{n}\t{P:.4f}\t\t{fp_rate_observed:.4f}\t\t{fill_ratio:.3f}")
     
@@ -190,9 +763,609 @@ def run_experiment():
                 P_optimal = calculate_P_probability(m, n_optimal, k)
                 print(f"{m}\t{k}\t{n_optimal}\t\t{P_optimal:.6f}")
     
+    experiments.flush()
     with open('questao_3_resultados.json', 'w') as f:
         json.dump(results, f, indent=2)
-    print("\nResultados salvos em 'questao_3_resultados.json'")
+    print(f"\nResultados salvos em 'questao_3_resultados.json', '{THEORY_FILE}' e '{EXPERIMENTS_STORE}/'")
+
+def bloom_grid_task(m, n, k, seed):
+    """
+    Uma célula da grade: filtro com m bits e n funções hash, k chaves inseridas e até
+    1000 chaves ausentes consultadas, tudo gerado a partir de seed.
+    """
+    random.seed(seed)
+    universe_size = k * 10
+    num_negative = min(universe_size - k, 1000)
+    
+    bloom = BloomFilter(m, n)
+    for chunk in stream_random_keys(k, universe_size, seed):
+        bloom.insert_many(np.array(chunk))
+    
+    false_positives = 0
+    for chunk in stream_random_keys(num_negative, universe_size, seed, start=k):
+        false_positives += int(bloom.contains_many(np.array(chunk)).sum())
+    
+    return {
+        'fpRateObserved': false_positives / num_negative if num_negative else 0,
+        'fillRatio': bloom.get_fill_ratio(),
+        'P': calculate_P_probability(m, n, k)
+    }
+
+def run_grid_experiment():
+    print("=== Grade de experimentos: m × n × k × semente ===\n")
+    
+    grid = {
+        'm': [1000, 10000, 100000],
+        'n': [1, 2, 5, 10, 20, 50],
+        'k': [10, 100, 1000]
+    }
+    num_seeds = 20
+    
+    start = time.time()
+    runs = run_grid(bloom_grid_task, grid, num_seeds)
+    summary = summarize(runs)
+    elapsed = time.time() - start
+    
+    print("m\tn\tk\tP\t\tFP Obs. (IC 95%)")
+    print("-" * 70)
+    for entry in summary:
+        params = entry['params']
+        fp = entry['metrics']['fpRateObserved']
+        P = entry['metrics']['P']['mean']
+        print(f"{params['m']}\t{params['n']}\t{params['k']}\t{P:.4f}\t\t"
+              f"{fp['mean']:.4f} [{fp['ci_low']:.4f}, {fp['ci_high']:.4f}]")
+    
+    print(f"\n{len(runs)} execuções em {elapsed:.1f}s usando {os.cpu_count()} processos")
+    
+    with open('questao_3_grade_resultados.json', 'w') as f:
+        json.dump({'grid': grid, 'num_seeds': num_seeds, 'runs': runs, 'summary': summary}, f, indent=2)
+    print("Resultados salvos em 'questao_3_grade_resultados.json'")
+
+def run_large_filter_experiment():
+    print("=== Filtros grandes: vetor de bits compactado ===\n")
+    
+    m_values = [10 ** 6, 10 ** 7, 10 ** 8, 5 * 10 ** 8]
+    k = 100000
+    n = 7
+    num_negative = 100000
+    seed = random.getrandbits(64)
+    universe_size = 10 ** 12
+    
+    results = {'k': k, 'n': n, 'runs': []}
+    
+    print("m\t\tMemória(MiB)\tLista(MiB)\tInserção(s)\tContagem(s)\tFill Ratio\tFP Obs.\t\tP")
+    print("-" * 110)
+    for m in m_values:
+        random.seed(seed)
+        bloom = BloomFilter(m, n)
+        
+        keys = np.array(generate_random_keys(k, universe_size, seed))
+        start = time.perf_counter()
+        bloom.insert_many(keys)
+        insert_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        fill_ratio = bloom.get_fill_ratio()
+        count_time = time.perf_counter() - start
+        
+        negative_keys = np.array(generate_random_keys(num_negative, universe_size, seed, start=k))
+        false_positives = int(bloom.contains_many(negative_keys).sum())
+        
+        run = {
+            'm': m,
+            'memory_bytes': bloom.memory_bytes(),
+            # o que a lista [False] * m ocupava: um ponteiro de 8 bytes por bit
+            'list_bytes': 8 * m,
+            'insert_time': insert_time,
+            'count_time': count_time,
+            'fillRatio': fill_ratio,
+            'fpRateObserved': false_positives / num_negative,
+            'P': calculate_P_probability(m, n, k)
+        }
+        results['runs'].append(run)
+        print(f"{m}\t{run['memory_bytes'] / 2 ** 20:.1f}\t\t{run['list_bytes'] / 2 ** 20:.1f}\t\t"
+              f"{insert_time:.2f}\t\t{count_time:.3f}\t\t{fill_ratio:.5f}\t\t"
+              f"{run['fpRateObserved']:.5f}\t\t{run['P']:.5f}")
+    
+    with open('questao_3_grande_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados salvos em 'questao_3_grande_resultados.json'")
+
+def run_hash_scheme_experiment():
+    print("=== Esquemas de hash: n funções independentes vs double hashing ===\n")
+    
+    m = 100000
+    k = 10000
+    n_values = [3, 7, 15, 30, 50]
+    num_negative = 20000
+    num_seeds = 5
+    universe_size = 10 ** 9
+    configurations = [
+        (hash_scheme, a_source)
+        for hash_scheme in BloomFilter.HASH_SCHEMES for a_source in BloomFilter.A_SOURCES
+    ]
+    
+    results = {'m': m, 'k': k, 'num_negative': num_negative, 'num_seeds': num_seeds, 'runs': []}
+    
+    print("Esquema\t\tParâmetros\tn\tP\t\tFP Obs.\t\tChaves/s (uma a uma)\tChaves/s (lote)")
+    print("-" * 110)
+    for hash_scheme, a_source in configurations:
+        for n in n_values:
+            fp_rates = []
+            scalar_time = 0
+            batch_time = 0
+            for replica in range(num_seeds):
+                seed = replica * 7919 + n
+                insert_keys = generate_random_keys(k, universe_size, seed)
+                negative_keys = generate_random_keys(num_negative, universe_size, seed, start=k)
+                
+                random.seed(seed)
+                bloom = BloomFilter(m, n, hash_scheme, a_source)
+                start = time.perf_counter()
+                for key in insert_keys:
+                    bloom.insert(key)
+                false_positives = sum(1 for key in negative_keys if bloom.contains(key))
+                scalar_time += time.perf_counter() - start
+                fp_rates.append(false_positives / num_negative)
+                
+                random.seed(seed)
+                bloom = BloomFilter(m, n, hash_scheme, a_source)
+                start = time.perf_counter()
+                bloom.insert_many(np.array(insert_keys))
+                bloom.contains_many(np.array(negative_keys))
+                batch_time += time.perf_counter() - start
+            
+            num_operations = num_seeds * (k + num_negative)
+            run = {
+                'hash_scheme': hash_scheme,
+                'a_source': a_source,
+                'n': n,
+                'P': calculate_P_probability(m, n, k),
+                'fpRateObserved': sum(fp_rates) / num_seeds,
+                'scalar_keys_per_second': num_operations / scalar_time,
+                'batch_keys_per_second': num_operations / batch_time
+            }
+            results['runs'].append(run)
+            print(f"{hash_scheme:<12}\t{a_source:<12}\t{n}\t{run['P']:.5f}\t\t{run['fpRateObserved']:.5f}\t\t"
+                  f"{run['scalar_keys_per_second']:.0f}\t\t\t{run['batch_keys_per_second']:.0f}")
+    
+    with open('questao_3_esquemas_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados salvos em 'questao_3_esquemas_resultados.json'")
+
+def run_blocked_filter_experiment():
+    print("=== Filtro em blocos (linhas de cache) vs filtro clássico ===\n")
+    
+    m_values = [10 ** 5, 10 ** 6, 10 ** 7, 10 ** 8]
+    bits_per_key = 10
+    n = 7
+    num_batch_queries = 1000000
+    num_scalar_queries = 100000
+    seed = random.getrandbits(64)
+    # chaves distintas de [0, 2^31 - 1) sorteadas com NumPy (a permutação de experimentos.py
+    # seria lenta para 10^7 chaves); abaixo do primo, chaves distintas não colidem no corpo
+    rng = np.random.default_rng(seed)
+    filters = {
+        'classico': lambda m: BloomFilter(m, n, a_source='prime_field'),
+        'blocos': lambda m: BlockedBloomFilter(m, n, a_source='prime_field')
+    }
+    
+    results = {'bits_per_key': bits_per_key, 'n': n, 'runs': []}
+    
+    print("Filtro\t\tm\t\tConsultas/s (lote)\tConsultas/s (uma a uma)\tFP Obs.\t\tP\t\tP blocos")
+    print("-" * 120)
+    for m in m_values:
+        k = m // bits_per_key
+        keys = np.unique(rng.integers(0, MERSENNE_PRIME_31, size=int(1.05 * (k + num_batch_queries))))
+        rng.shuffle(keys)
+        insert_keys = keys[:k]
+        negative_keys = keys[k:k + num_batch_queries]
+        scalar_keys = negative_keys[:num_scalar_queries].tolist()
+        
+        for filter_name, make_filter in filters.items():
+            random.seed(seed)
+            bloom = make_filter(m)
+            bloom.insert_many(insert_keys)
+            
+            start = time.perf_counter()
+            false_positives = int(bloom.contains_many(negative_keys).sum())
+            batch_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for key in scalar_keys:
+                bloom.contains(key)
+            scalar_time = time.perf_counter() - start
+            
+            run = {
+                'filter': filter_name,
+                'm': bloom.m,
+                'k': k,
+                'batch_queries_per_second': num_batch_queries / batch_time,
+                'scalar_queries_per_second': num_scalar_queries / scalar_time,
+                'fpRateObserved': false_positives / num_batch_queries,
+                'fillRatio': bloom.get_fill_ratio(),
+                'P': calculate_P_probability(bloom.m, n, k),
+                'P_blocked': calculate_blocked_P_probability(bloom.m, n, k)
+            }
+            results['runs'].append(run)
+            print(f"{filter_name}\t\t{bloom.m}\t{run['batch_queries_per_second']:.0f}\t\t\t"
+                  f"{run['scalar_queries_per_second']:.0f}\t\t\t{run['fpRateObserved']:.5f}\t\t"
+                  f"{run['P']:.5f}\t\t{run['P_blocked']:.5f}")
+    
+    with open('questao_3_blocos_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados salvos em 'questao_3_blocos_resultados.json'")
+
+def run_scalable_filter_experiment():
+    print("=== Filtro escalável: crescimento de k além da capacidade prevista ===\n")
+    
+    initial_capacity = 1000
+    error_rate = 0.01
+    k_values = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+    num_batch_queries = 100000
+    num_scalar_queries = 10000
+    seed = random.getrandbits(64)
+    # chaves distintas de [0, 2^31 - 1), como no experimento dos blocos
+    rng = np.random.default_rng(seed)
+    keys = np.unique(rng.integers(0, MERSENNE_PRIME_31, size=int(1.05 * (k_values[-1] + num_batch_queries))))
+    rng.shuffle(keys)
+    negative_keys = keys[k_values[-1]:k_values[-1] + num_batch_queries]
+    scalar_negative_keys = negative_keys[:num_scalar_queries].tolist()
+    
+    random.seed(seed)
+    scalable = ScalableBloomFilter(initial_capacity, error_rate)
+    # filtro fixo com o mesmo dimensionamento do primeiro sub-filtro, mas com a taxa alvo inteira
+    fixed_m = math.ceil(-initial_capacity * math.log(error_rate) / math.log(2) ** 2)
+    fixed = BloomFilter(fixed_m, calculate_optimal_n(fixed_m, initial_capacity), a_source='prime_field')
+    
+    results = {'initial_capacity': initial_capacity, 'error_rate': error_rate, 'runs': []}
+    
+    print("k		Sub-filtros	Memória(KiB)	Bits/chave	Ótimo	FP Obs.		FP Esperado	FP Fixo		"
+          "µs/consulta (lote)	µs/consulta (uma a uma)	µs/positiva")
+    print("-" * 170)
+    inserted = 0
+    for k in k_values:
+        new_keys = keys[inserted:k]
+        scalable.insert_many(new_keys)
+        fixed.insert_many(new_keys)
+        inserted = k
+        
+        start = time.perf_counter()
+        false_positives = int(scalable.contains_many(negative_keys).sum())
+        batch_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for key in scalar_negative_keys:
+            scalable.contains(key)
+        scalar_time = time.perf_counter() - start
+        
+        # as chaves mais recentes estão no sub-filtro mais novo, consultado primeiro
+        positive_keys = keys[max(0, k - num_scalar_queries):k].tolist()
+        start = time.perf_counter()
+        for key in positive_keys:
+            scalable.contains(key)
+        positive_time = time.perf_counter() - start
+        
+        run = {
+            'k': k,
+            'num_filters': len(scalable.filters),
+            'm': scalable.m,
+            'memory_bytes': scalable.memory_bytes(),
+            'bits_per_key': scalable.m / k,
+            # bits por chave de um filtro fixo dimensionado já sabendo k: -ln(p) / ln(2)^2
+            'optimal_bits_per_key': -math.log(error_rate) / math.log(2) ** 2,
+            'fpRateObserved': false_positives / num_batch_queries,
+            'fpRateExpected': scalable.expected_fp_rate(),
+            'fpRateFixed': float(fixed.contains_many(negative_keys).mean()),
+            'batch_query_us': batch_time / num_batch_queries * 1e6,
+            'scalar_query_us': scalar_time / num_scalar_queries * 1e6,
+            'positive_query_us': positive_time / len(positive_keys) * 1e6
+        }
+        results['runs'].append(run)
+        print(f"{k}\t\t{run['num_filters']}\t\t{run['memory_bytes'] / 1024:.1f}\t\t{run['bits_per_key']:.2f}\t\t"
+              f"{run['optimal_bits_per_key']:.2f}\t{run['fpRateObserved']:.5f}\t\t{run['fpRateExpected']:.5f}\t\t"
+              f"{run['fpRateFixed']:.5f}\t\t{run['batch_query_us']:.3f}\t\t\t{run['scalar_query_us']:.2f}\t\t\t"
+              f"{run['positive_query_us']:.2f}")
+    
+    with open('questao_3_escalavel_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados salvos em 'questao_3_escalavel_resultados.json'")
+
+def run_counting_filter_experiment():
+    print("=== Filtro com contadores: janela deslizante vs reconstrução ===\n")
+    
+    window = 100000
+    bits_per_key = 10
+    n = 7
+    slide_values = [100, 1000, 10000]
+    num_steps = 10
+    num_queries = 100000
+    m = window * bits_per_key
+    seed = random.getrandbits(64)
+    # chaves distintas de [0, 2^31 - 1), como no experimento dos blocos
+    rng = np.random.default_rng(seed)
+    stream_size = window + num_steps * max(slide_values)
+    keys = np.unique(rng.integers(0, MERSENNE_PRIME_31, size=int(1.05 * (stream_size + num_queries))))
+    rng.shuffle(keys)
+    negative_keys = keys[stream_size:stream_size + num_queries]
+    
+    random.seed(seed)
+    counting = CountingBloomFilter(m, n, a_source='prime_field')
+    counting.insert_many(keys[:window])
+    plain = counting.to_bloom_filter()
+    
+    # custo das operações uma a uma, em chaves que entram e saem da janela
+    scalar_keys = keys[window:window + 10000].tolist()
+    timings = {}
+    start = time.perf_counter()
+    for key in scalar_keys:
+        counting.insert(key)
+    timings['insert'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in scalar_keys:
+        counting.contains(key)
+    timings['contains'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in scalar_keys:
+        counting.remove(key)
+    timings['remove'] = time.perf_counter() - start
+    scalar_ops = {f'{operation}_per_second': len(scalar_keys) / elapsed for operation, elapsed in timings.items()}
+    
+    start = time.perf_counter()
+    counting.contains_many(negative_keys)
+    counting_query_time = time.perf_counter() - start
+    start = time.perf_counter()
+    plain.contains_many(negative_keys)
+    plain_query_time = time.perf_counter() - start
+    
+    results = {
+        'window': window, 'm': m, 'n': n, 'num_steps': num_steps,
+        'counting_memory_bytes': counting.memory_bytes(),
+        'bloom_memory_bytes': plain.memory_bytes(),
+        'scalar_ops': scalar_ops,
+        'counting_queries_per_second': num_queries / counting_query_time,
+        'bloom_queries_per_second': num_queries / plain_query_time,
+        'runs': []
+    }
+    print(f"Memória: contadores {results['counting_memory_bytes'] / 1024:.0f} KiB, "
+          f"bits {results['bloom_memory_bytes'] / 1024:.0f} KiB")
+    print("Uma a uma (ops/s): " + ", ".join(f"{operation} {rate:.0f}" for operation, rate in scalar_ops.items()))
+    print(f"Consultas em lote (ops/s): contadores {results['counting_queries_per_second']:.0f}, "
+          f"bits {results['bloom_queries_per_second']:.0f}\n")
+    
+    print("Deslize\tAtualização(ms)\tReconstrução(ms)\tFP Contadores\tFP Reconstruído\tSaturados")
+    print("-" * 100)
+    for slide in slide_values:
+        random.seed(seed)
+        counting = CountingBloomFilter(m, n, a_source='prime_field')
+        counting.insert_many(keys[:window])
+        update_time = 0
+        rebuild_time = 0
+        for step in range(1, num_steps + 1):
+            first = step * slide
+            start = time.perf_counter()
+            counting.insert_many(keys[first + window - slide:first + window])
+            removed = counting.remove_many(keys[first - slide:first])
+            update_time += time.perf_counter() - start
+            
+            # alternativa sem remoção: um filtro novo com as chaves da janela atual
+            start = time.perf_counter()
+            random.seed(seed)
+            rebuilt = BloomFilter(m, n, a_source='prime_field')
+            rebuilt.insert_many(keys[first:first + window])
+            rebuild_time += time.perf_counter() - start
+        
+        live_keys = keys[num_steps * slide:num_steps * slide + window]
+        if not removed.all() or not counting.contains_many(live_keys).all():
+            raise RuntimeError("O filtro com contadores perdeu chaves da janela")
+        run = {
+            'slide': slide,
+            'update_ms_per_step': update_time / num_steps * 1000,
+            'rebuild_ms_per_step': rebuild_time / num_steps * 1000,
+            'update_keys_per_second': 2 * slide * num_steps / update_time,
+            'fpRateCounting': float(counting.contains_many(negative_keys).mean()),
+            'fpRateRebuilt': float(rebuilt.contains_many(negative_keys).mean()),
+            'saturated': counting.get_saturated_count()
+        }
+        results['runs'].append(run)
+        print(f"{slide}\t{run['update_ms_per_step']:.2f}\t\t{run['rebuild_ms_per_step']:.2f}\t\t\t"
+              f"{run['fpRateCounting']:.5f}\t\t{run['fpRateRebuilt']:.5f}\t\t{run['saturated']}")
+    
+    with open('questao_3_contagem_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados salvos em 'questao_3_contagem_resultados.json'")
+
+def bloom_query_task(path, keys):
+    """Tarefa de um processo de consulta: abre o filtro de path por mmap e consulta keys."""
+    start = time.perf_counter()
+    bloom = BloomFilter.load(path)
+    load_time = time.perf_counter() - start
+    found = bloom.contains_many(keys)
+    bloom.close()
+    return load_time, found
+
+def run_persistent_filter_experiment():
+    print("=== Filtros persistentes: gravação, abertura por mmap e união ===\n")
+    
+    m_values = [10 ** 6, 10 ** 7, 10 ** 8, 10 ** 9]
+    k = 100000
+    n = 7
+    num_queries = 100000
+    num_workers = 4
+    seed = random.getrandbits(64)
+    # chaves distintas de [0, 2^31 - 1), como no experimento dos blocos
+    rng = np.random.default_rng(seed)
+    keys = np.unique(rng.integers(0, MERSENNE_PRIME_31, size=int(1.05 * (k + num_queries))))
+    rng.shuffle(keys)
+    insert_keys = keys[:k]
+    query_keys = np.concatenate([insert_keys[:num_queries // 2], keys[k:k + num_queries // 2]])
+    
+    results = {'k': k, 'n': n, 'num_workers': num_workers, 'runs': []}
+    
+    print("m\t\tArquivo(MiB)\tGravação(ms)\tmmap(ms)\tCópia(ms)\tProcesso(ms)\tUnião(ms)\tInterseção(ms)")
+    print("-" * 120)
+    with tempfile.TemporaryDirectory() as directory:
+        for m in m_values:
+            path = os.path.join(directory, f'filtro_{m}.bloom')
+            # dois filtros construídos separadamente, cada um com metade das chaves; a mesma
+            # semente dá as mesmas funções hash, então podem ser combinados
+            halves = [BloomFilter(m, n, a_source='prime_field', seed=seed) for _ in range(2)]
+            halves[0].insert_many(insert_keys[:k // 2])
+            halves[1].insert_many(insert_keys[k // 2:])
+            
+            start = time.perf_counter()
+            bloom = halves[0].union(halves[1])
+            union_time = time.perf_counter() - start
+            start = time.perf_counter()
+            halves[0].intersection(halves[1])
+            intersection_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            bloom.save(path)
+            save_time = time.perf_counter() - start
+            expected = bloom.contains_many(query_keys)
+            
+            start = time.perf_counter()
+            mapped = BloomFilter.load(path)
+            load_time = time.perf_counter() - start
+            if not (mapped.contains_many(query_keys) == expected).all():
+                raise RuntimeError("O filtro aberto por mmap difere do gravado")
+            mapped.close()
+            
+            # alternativa com cópia: ler o arquivo inteiro para a memória do processo
+            start = time.perf_counter()
+            with open(path, 'rb') as f:
+                bytearray(f.read())
+            copy_time = time.perf_counter() - start
+            
+            # num_workers processos abrem o mesmo arquivo e consultam fatias das chaves
+            with Pool(num_workers) as pool:
+                answers = pool.starmap(bloom_query_task, [(path, chunk) for chunk in np.array_split(query_keys, num_workers)])
+            if not (np.concatenate([found for _, found in answers]) == expected).all():
+                raise RuntimeError("Os processos de consulta responderam diferente do filtro gravado")
+            
+            run = {
+                'm': m,
+                'file_bytes': os.path.getsize(path),
+                'save_ms': save_time * 1000,
+                'mmap_load_ms': load_time * 1000,
+                'copy_load_ms': copy_time * 1000,
+                'worker_load_ms': max(worker_load for worker_load, _ in answers) * 1000,
+                'union_ms': union_time * 1000,
+                'intersection_ms': intersection_time * 1000,
+                'fpRateObserved': float(expected[num_queries // 2:].mean()),
+                'P': calculate_P_probability(m, n, k)
+            }
+            results['runs'].append(run)
+            print(f"{m}\t{run['file_bytes'] / 2 ** 20:.1f}\t\t{run['save_ms']:.2f}\t\t{run['mmap_load_ms']:.3f}\t\t"
+                  f"{run['copy_load_ms']:.2f}\t\t{run['worker_load_ms']:.3f}\t\t{run['union_ms']:.2f}\t\t"
+                  f"{run['intersection_ms']:.2f}")
+            os.remove(path)
+    
+    with open('questao_3_persistente_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados salvos em 'questao_3_persistente_resultados.json'")
+
+def run_theory_grid_experiment():
+    print("=== Grade teórica: laço + JSON vs broadcasting + .npz ===\n")
+    
+    # a grade do experimento padrão (2 × 4 × 120) e versões 10×, 100× e 1000× mais densas
+    shapes = [(2, 4, 120), (2, 40, 120), (20, 40, 120), (40, 40, 600)]
+    # o laço com uma lista de dicionários em JSON só é medido até esse número de pontos
+    max_loop_points = 10 ** 6
+    
+    results = {'runs': []}
+    
+    print("Pontos\t\tCálculo(ms)\tGravação(ms)\tArquivo(MiB)\tCurva(ms)\t|\tLaço(ms)\tJSON(ms)\tArquivo(MiB)\tCurva(ms)")
+    print("-" * 150)
+    with tempfile.TemporaryDirectory() as directory:
+        for num_k, num_m, num_n in shapes:
+            axes = {
+                'k': np.unique(np.geomspace(10, 1000, num_k).round().astype(np.int64)),
+                'm': np.unique(np.geomspace(1000, 10 ** 6, num_m).round().astype(np.int64)),
+                'n': np.unique(np.linspace(1, 600, num_n).round().astype(np.int64))
+            }
+            num_points = len(axes['k']) * len(axes['m']) * len(axes['n'])
+            # curva selecionada para o gráfico: o maior k e o menor m
+            k, m = axes['k'][-1], axes['m'][0]
+            
+            start = time.perf_counter()
+            P = calculate_P_grid(axes['m'][None, :, None], axes['n'][None, None, :], axes['k'][:, None, None])
+            compute_time = time.perf_counter() - start
+            path = os.path.join(directory, 'teoria.npz')
+            start = time.perf_counter()
+            save_grid(path, axes, P=P)
+            store_time = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded_axes, values = load_grid(path)
+            curve = values['P'][axis_index(loaded_axes['k'], k), axis_index(loaded_axes['m'], m)]
+            select_time = time.perf_counter() - start
+            
+            run = {
+                'points': num_points,
+                'grid_compute_ms': compute_time * 1000,
+                'grid_store_ms': store_time * 1000,
+                'grid_file_bytes': os.path.getsize(path),
+                'grid_curve_ms': select_time * 1000
+            }
+            
+            if num_points <= max_loop_points:
+                start = time.perf_counter()
+                theory = [
+                    {'m': int(m_value), 'n': int(n_value), 'k': int(k_value),
+                     'P': calculate_P_probability(int(m_value), int(n_value), int(k_value))}
+                    for k_value in axes['k'] for m_value in axes['m'] for n_value in axes['n']
+                ]
+                loop_time = time.perf_counter() - start
+                path = os.path.join(directory, 'teoria.json')
+                start = time.perf_counter()
+                with open(path, 'w') as f:
+                    json.dump({'theory': theory}, f, indent=2)
+                json_time = time.perf_counter() - start
+                start = time.perf_counter()
+                with open(path) as f:
+                    theory = json.load(f)['theory']
+                json_curve = [item['P'] for item in theory if item['m'] == m and item['k'] == k]
+                json_select_time = time.perf_counter() - start
+                if not np.allclose(json_curve, curve, rtol=1e-9, atol=1e-12):
+                    raise RuntimeError("A grade vetorizada difere do cálculo ponto a ponto")
+                run.update({
+                    'loop_compute_ms': loop_time * 1000,
+                    'json_store_ms': json_time * 1000,
+                    'json_file_bytes': os.path.getsize(path),
+                    'json_curve_ms': json_select_time * 1000
+                })
+            
+            results['runs'].append(run)
+            line = (f"{num_points}\t\t{run['grid_compute_ms']:.2f}\t\t{run['grid_store_ms']:.2f}\t\t"
+                    f"{run['grid_file_bytes'] / 2 ** 20:.2f}\t\t{run['grid_curve_ms']:.2f}\t\t|\t")
+            if 'loop_compute_ms' in run:
+                line += (f"{run['loop_compute_ms']:.1f}\t\t{run['json_store_ms']:.1f}\t\t"
+                         f"{run['json_file_bytes'] / 2 ** 20:.2f}\t\t{run['json_curve_ms']:.1f}")
+            else:
+                line += "-\t\t-\t\t-\t\t-"
+            print(line)
+    
+    with open('questao_3_teoria_resultados.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResultados salvos em 'questao_3_teoria_resultados.json'")
+
+EXPERIMENTS = {
+    'padrao': run_experiment,
+    'grade': run_grid_experiment,
+    'grande': run_large_filter_experiment,
+    'esquemas': run_hash_scheme_experiment,
+    'blocos': run_blocked_filter_experiment,
+    'escalavel': run_scalable_filter_experiment,
+    'contagem': run_counting_filter_experiment,
+    'persistente': run_persistent_filter_experiment,
+    'teoria': run_theory_grid_experiment
+}
 
 if __name__ == '__main__':
-    run_experiment() 
+    parser = argparse.ArgumentParser(description="Estudo experimental de filtros de Bloom")
+    parser.add_argument('modo', nargs='?', default='padrao', choices=list(EXPERIMENTS),
+                        help="experimento a executar (padrão: o estudo original)")
+    args = parser.parse_args()
+    EXPERIMENTS[args.modo]()
+
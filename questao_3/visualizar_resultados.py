@@ -1,12 +1,17 @@
-import json
+import os
+import sys
+
 import matplotlib.pyplot as plt
 import numpy as np
 
-def plot_main_analysis():
-    with open('questao_3_resultados.json', 'r') as f:
-        data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from colunar import load_grid, axis_index
 
-    theory = data.get('theory', [])
+def plot_main_analysis():
+    # grade k × m × n de questao_3.py: cada curva é uma linha P[índice de k, índice de m]
+    axes, values = load_grid('questao_3_teoria.npz')
+    n_axis = axes['n']
+    P = values['P']
 
     plt.style.use('seaborn-v0_8-whitegrid')
     
@@ -17,30 +22,29 @@ def plot_main_analysis():
     k_values_to_plot = [10, 100]
     colors = ['blue', 'red']
     
+    m_index = axis_index(axes['m'], m_selected)
     for i, k in enumerate(k_values_to_plot):
-        theory_data = [item for item in theory if item['m'] == m_selected and item['k'] == k]
-        theory_data.sort(key=lambda x: x['n'])
+        curve = P[axis_index(axes['k'], k), m_index]
+        n_theory = np.concatenate([[0], n_axis])
+        P_theory = np.concatenate([[0.0], curve])
+        
+        plt.plot(n_theory, P_theory, 
+                color=colors[i], linewidth=2.5,
+                label=f'k = {k}')
         
-        if theory_data:
-            n_theory = [0] + [item['n'] for item in theory_data]
-            P_theory = [0.0] + [item['P'] for item in theory_data]
-            
-            plt.plot(n_theory, P_theory, 
-                    color=colors[i], linewidth=2.5,
-                    label=f'k = {k}')
-            
-            n_optimal = round((m_selected / k) * np.log(2))
-            P_optimal = next((item['P'] for item in theory_data if item['n'] == n_optimal), None)
-            
-            if P_optimal is not None:
-                plt.plot(n_optimal, P_optimal, 'o', color=colors[i], markersize=8, 
-                        markeredgecolor='black', markeredgewidth=1.5)
-                plt.annotate(f'ótimo n = {n_optimal}', 
-                            xy=(n_optimal, P_optimal),
-                            xytext=(n_optimal + 50, P_optimal + 0.02),
-                            color=colors[i],
-                            fontsize=11,
-                            arrowprops=dict(arrowstyle='->', color=colors[i], lw=1))
+        n_optimal = round((m_selected / k) * np.log(2))
+        optimal_index = np.flatnonzero(n_axis == n_optimal)
+        
+        if len(optimal_index):
+            P_optimal = curve[optimal_index[0]]
+            plt.plot(n_optimal, P_optimal, 'o', color=colors[i], markersize=8, 
+                    markeredgecolor='black', markeredgewidth=1.5)
+            plt.annotate(f'ótimo n = {n_optimal}', 
+                        xy=(n_optimal, P_optimal),
+                        xytext=(n_optimal + 50, P_optimal + 0.02),
+                        color=colors[i],
+                        fontsize=11,
+                        arrowprops=dict(arrowstyle='->', color=colors[i], lw=1))
     
     plt.xlim(0, 600)
     plt.ylim(0, 0.30)
@@ -62,27 +66,26 @@ def plot_main_analysis():
     plt.figure(figsize=(14, 10))
     
     k_selected = 100
-    m_values = sorted(list(set(item['m'] for item in theory)))
+    m_values = axes['m'].tolist()
     colors = plt.cm.viridis(np.linspace(0, 1, len(m_values)))
+    k_index = axis_index(axes['k'], k_selected)
     
     for i, m in enumerate(m_values):
-        theory_data = [item for item in theory if item['m'] == m and item['k'] == k_selected]
-        theory_data.sort(key=lambda x: x['n'])
+        curve = P[k_index, i]
+        n_theory = np.concatenate([[0], n_axis])
+        P_theory = np.concatenate([[0.0], curve])
+        
+        plt.plot(n_theory, P_theory, 
+                linestyle='-', linewidth=2.5,
+                label=f'm = {m:,} bits', color=colors[i])
+        
+        n_optimal = round((m / k_selected) * np.log(2))
+        optimal_index = np.flatnonzero(n_axis == n_optimal)
         
-        if theory_data:
-            n_theory = [0] + [item['n'] for item in theory_data]
-            P_theory = [0.0] + [item['P'] for item in theory_data]
-            
-            plt.plot(n_theory, P_theory, 
-                    linestyle='-', linewidth=2.5,
-                    label=f'm = {m:,} bits', color=colors[i])
-            
-            n_optimal = round((m / k_selected) * np.log(2))
-            P_optimal = next((item['P'] for item in theory_data if item['n'] == n_optimal), None)
-            
-            if P_optimal is not None and n_optimal <= 600:
-                plt.plot(n_optimal, P_optimal, 'o', markersize=8, color=colors[i], 
-                        markeredgecolor='black', markeredgewidth=1.5)
+        if len(optimal_index) and n_optimal <= 600:
+            P_optimal = curve[optimal_index[0]]
+            plt.plot(n_optimal, P_optimal, 'o', markersize=8, color=colors[i], 
+                    markeredgecolor='black', markeredgewidth=1.5)
     
     plt.xlim(0, 600)
     plt.ylim(0, 1.05)